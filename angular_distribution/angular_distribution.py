@@ -1,7 +1,10 @@
+# Run from the repository root: python -m angular_distribution.angular_distribution
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib as mpl
 
+from histograms_stats_molecule_formation.molecule_formation_cache import load_fragment_table
+
 # Set global font to Times New Roman
 mpl.rcParams['font.family'] = 'Times New Roman'
 mpl.rcParams['font.weight'] = 'bold'
@@ -69,21 +72,18 @@ class AngularDistribution:
         return theta
 
     def parse_data(self):
-        with open(self.file_path, 'r') as file:
-            lines = file.readlines()
-
-        for i, line in enumerate(lines):
-            if line.startswith('r_seed') or line.startswith('C2H2'):
-                x_vel = float(lines[i + 4].split(',')[self.atom_number + 1].strip())
-                y_vel = float(lines[i + 5].split(',')[self.atom_number + 1].strip())
-                z_vel = float(lines[i + 6].split(',')[self.atom_number + 1].strip())
-                speed = float(lines[i + 7].split(',')[self.atom_number + 1].strip())
-
-                theta = self.calculate_theta(x_vel, y_vel, z_vel)
-                kinetic_energy = 0.5 * self.mass * speed ** 2
-
-                self.thetas.append(theta)
-                self.kinetic_energies.append(kinetic_energy)
+        table = load_fragment_table(self.file_path)
+        atom = table['position'] == self.atom_number
+
+        for x_vel, y_vel, z_vel, speed in zip(table['x_velocities'][atom].tolist(),
+                                              table['y_velocities'][atom].tolist(),
+                                              table['z_velocities'][atom].tolist(),
+                                              table['speeds'][atom].tolist()):
+            theta = self.calculate_theta(x_vel, y_vel, z_vel)
+            kinetic_energy = 0.5 * self.mass * speed ** 2
+
+            self.thetas.append(theta)
+            self.kinetic_energies.append(kinetic_energy)
 
     def plot(self, ax):
         # Ensure that LaTeX-style formatting is used correctly for subscripts in labels
@@ -0,0 +1,142 @@
+# Benchmarks the moleculeFormations.csv parsing paths on synthetic files of growing size: run time, throughput and
+# peak memory, cold (no .npz cache) and warm (cache already written)
+# Run from the repository root: python -m benchmarks.benchmark_parsers
+# Author: Samuel S. Taylor
+
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import matplotlib
+matplotlib.use('Agg')
+
+from benchmarks.synthetic_molecule_formations import generate_molecule_formations
+from histograms_stats_molecule_formation.molecule_formation_cache import cache_path, index_path
+from histograms_stats_molecule_formation.fragments_stats_plots import process_fragments
+from newton_plot.newton_plot import NewtonPlot
+from angular_distribution.angular_distribution import AngularDistribution
+from proton_projectile_analyze.analyze import extract_data
+
+# Number of simulation blocks per synthetic file, and the molecules (fragment counts per block grow with size).
+# Add 1000000 for the full 1e2-1e6 sweep, generating and parsing those files takes several minutes per molecule.
+BLOCK_COUNTS = (100, 1000, 10000, 100000)
+MOLECULES = ('C2H2', 'C4H10')
+SEED = 0
+REPEATS = 3  # timings report the best of REPEATS runs
+MEASURE_MEMORY = True  # tracemalloc slows the traced run down a lot, it is a separate run from the timings
+
+
+def run_process_fragments(filepath):
+    process_fragments(filepath)
+
+
+def run_newton_plot(filepath):
+    NewtonPlot().process_data(filepath)
+
+
+def run_angular_distribution(filepath):
+    AngularDistribution(filepath, 'C', 0, 'quantum', 0.1).parse_data()
+
+
+def run_extract_data(filepath):
+    with open(filepath, 'r') as file:
+        extract_data(file.read(), 'z')
+
+
+# (name, function, reads through the .npz cache)
+BENCHMARKS = [
+    ('process_fragments', run_process_fragments, True),
+    ('NewtonPlot.process_data', run_newton_plot, True),
+    ('AngularDistribution.parse_data', run_angular_distribution, True),
+    ('proton extract_data', run_extract_data, False),
+]
+
+
+def clear_cache(filepath):
+    for path in (cache_path(filepath), index_path(filepath)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def best_time(function, filepath, repeats, cold):
+    times = []
+    for _ in range(repeats):
+        if cold:
+            clear_cache(filepath)
+        start = time.perf_counter()
+        function(filepath)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def peak_memory(function, filepath, cold):
+    # Peak traced allocation (Python objects and NumPy buffers) in bytes
+    if cold:
+        clear_cache(filepath)
+    tracemalloc.start()
+    try:
+        function(filepath)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def benchmark_file(filepath, num_blocks, repeats=REPEATS, measure_memory=MEASURE_MEMORY):
+    """
+    Runs every benchmark on one file and returns a list of result dicts. Cache backed parsers are measured twice:
+    cold (cache removed before every run) and warm (cache left in place).
+    """
+    results = []
+    for name, function, uses_cache in BENCHMARKS:
+        for cold in ((True, False) if uses_cache else (False,)):
+            try:
+                if not cold:
+                    function(filepath)  # make sure the cache exists
+                seconds = best_time(function, filepath, repeats, cold)
+                peak = peak_memory(function, filepath, cold) if measure_memory else None
+                error = None
+            except Exception as e:  # keep going so one broken path does not hide the others
+                seconds, peak, error = None, None, f'{type(e).__name__}: {e}'
+            mode = ('cold' if cold else 'warm') if uses_cache else '-'
+            results.append({'name': name, 'mode': mode, 'blocks': num_blocks, 'seconds': seconds,
+                            'peak_bytes': peak, 'error': error})
+    return results
+
+
+def print_results(molecule, file_size, results):
+    print(f"\n{molecule}: {results[0]['blocks']} blocks, {file_size / 1e6:.1f} MB")
+    print(f"{'Benchmark':<32}{'Cache':>6}{'Time [s]':>11}{'Blocks/s':>12}{'MB/s':>9}{'Peak MB':>10}")
+    for result in results:
+        if result['error']:
+            print(f"{result['name']:<32}{result['mode']:>6}  FAILED: {result['error']}")
+            continue
+        seconds = result['seconds']
+        peak = '-' if result['peak_bytes'] is None else f"{result['peak_bytes'] / 1e6:.1f}"
+        print(f"{result['name']:<32}{result['mode']:>6}{seconds:>11.4f}{result['blocks'] / seconds:>12.0f}"
+              f"{file_size / 1e6 / seconds:>9.1f}{peak:>10}")
+
+
+def main():
+    print("-= MOLECULE FORMATION PARSER BENCHMARKS =-")
+
+    work_directory = tempfile.mkdtemp(prefix='molecule_formation_benchmark_')
+    current_directory = os.getcwd()
+    os.chdir(work_directory)  # NewtonPlot.process_data creates an images folder in the working directory
+    try:
+        for molecule in MOLECULES:
+            for num_blocks in BLOCK_COUNTS:
+                filepath = os.path.join(work_directory, f'moleculeFormations_{molecule}_{num_blocks}.csv')
+                generate_molecule_formations(filepath, num_blocks, molecule=molecule, seed=SEED)
+                results = benchmark_file(filepath, num_blocks)
+                print_results(molecule, os.path.getsize(filepath), results)
+                os.remove(filepath)
+                clear_cache(filepath)
+    finally:
+        os.chdir(current_directory)
+        shutil.rmtree(work_directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+# Deterministic generator of synthetic moleculeFormations.csv files (9-line block format) for benchmarking the parsers
+# Author: Samuel S. Taylor
+
+import numpy as np
+
+# (carbons, hydrogens) of the hydrocarbons the generator knows how to break apart
+MOLECULES = {
+    'C2H2': (2, 2),
+    'C2H6': (2, 6),
+    'C3H8': (3, 8),
+    'C4H10': (4, 10),
+}
+
+# Chance that a hydrogen leaves as its own fragment, and that a C-C bond of the chain breaks
+HYDROGEN_LOSS_PROBABILITY = 0.6
+CARBON_BOND_BREAK_PROBABILITY = 0.3
+
+
+def fragment_formula(num_carbons, num_hydrogens):
+    formula = ''
+    if num_carbons:
+        formula += 'C' + (str(num_carbons) if num_carbons > 1 else '')
+    if num_hydrogens:
+        formula += 'H' + (str(num_hydrogens) if num_hydrogens > 1 else '')
+    return formula
+
+
+def fragment_atoms(rng, num_carbons, num_hydrogens):
+    """
+    Breaks one molecule apart: atoms 0..num_carbons-1 are the carbon chain and the rest are hydrogens. Returns a
+    list of (formula, [atom indices]) with the carbon containing fragments first and lone hydrogens last.
+    """
+    # Split the carbon chain at the broken bonds
+    breaks = np.flatnonzero(rng.random(num_carbons - 1) < CARBON_BOND_BREAK_PROBABILITY) + 1
+    chains = np.split(np.arange(num_carbons), breaks)
+
+    hydrogens = np.arange(num_carbons, num_carbons + num_hydrogens)
+    lost = rng.random(num_hydrogens) < HYDROGEN_LOSS_PROBABILITY
+    owners = rng.integers(0, len(chains), size=num_hydrogens)
+
+    fragments = []
+    for chain_index, chain in enumerate(chains):
+        bound = hydrogens[~lost & (owners == chain_index)]
+        fragments.append((fragment_formula(len(chain), len(bound)), chain.tolist() + bound.tolist()))
+    for hydrogen in hydrogens[lost]:
+        fragments.append(('H', [int(hydrogen)]))
+    return fragments
+
+
+def format_row(label, values):
+    return label + ', ' + ', '.join(f'{value:.6g}' for value in values) + ',\n'
+
+
+def format_block(run_id, fragments, rng):
+    # One 9-line block: header, Densities, Time[fs], Density Sum, X/Y/Z Velocity, Speed, blank line
+    num_frags = len(fragments)
+    sizes = np.array([len(atoms) for _, atoms in fragments])
+    densities = sizes * 2.5 + rng.normal(0, 0.4, num_frags)
+    times = rng.uniform(10, 100, num_frags)
+    velocities = rng.normal(0, 0.05, (3, num_frags)) / np.sqrt(sizes)
+    speeds = np.sqrt((velocities ** 2).sum(axis=0))
+
+    header = run_id + ', ' + ', '.join(formula + ''.join(f'[{atom}]' for atom in atoms)
+                                      for formula, atoms in fragments) + ',\n'
+    return (header
+            + format_row('Densities', densities)
+            + format_row('Time[fs]', times)
+            + f'Density Sum, {densities.sum():.6g}\n'
+            + format_row('X Velocity[A/fs]', velocities[0])
+            + format_row('Y Velocity[A/fs]', velocities[1])
+            + format_row('Z Velocity[A/fs]', velocities[2])
+            + format_row('Speed[A/fs]', speeds)
+            + '\n')
+
+
+def generate_molecule_formations(filepath, num_blocks, molecule='C2H6', seed=0):
+    """
+    Writes num_blocks synthetic simulation blocks of molecule to filepath. The same (num_blocks, molecule, seed)
+    always gives byte for byte the same file. Returns the number of fragment events written.
+    """
+    if molecule not in MOLECULES:
+        raise ValueError(f"Unknown molecule '{molecule}', expected one of {', '.join(MOLECULES)}")
+    num_carbons, num_hydrogens = MOLECULES[molecule]
+    rng = np.random.default_rng(seed)
+
+    num_events = 0
+    with open(filepath, 'w', newline='') as file:
+        for i in range(num_blocks):
+            fragments = fragment_atoms(rng, num_carbons, num_hydrogens)
+            num_events += len(fragments)
+            file.write(format_block(f'{molecule}_pulse_7_5r{i}', fragments, rng))
+    return num_events
+
+
+def main():
+    filepath = 'moleculeFormations_synthetic.csv'
+    num_events = generate_molecule_formations(filepath, 1000, molecule='C2H6', seed=0)
+    print("Wrote", num_events, "fragments in 1000 simulations to:", filepath)
+
+
+if __name__ == '__main__':
+    main()
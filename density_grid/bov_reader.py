@@ -0,0 +1,147 @@
+# Reader for the dens#####.bov / .dat density output: parses the BOV header and memory-maps the binary grid as a
+# NumPy array, for single time steps or a whole run directory
+# Author: Samuel S. Taylor
+
+import os
+import re
+from collections import namedtuple
+import numpy as np
+
+# DATA_FORMAT -> NumPy type (byte order from DATA_ENDIAN)
+DATA_FORMATS = {'BYTE': 'u1', 'SHORT': 'i2', 'INT': 'i4', 'FLOAT': 'f4', 'DOUBLE': 'f8'}
+BOV_PATTERN = re.compile(r'dens(\d+)\.bov$')
+
+# data_size is the number of grid points along x, y, z. brick_origin / brick_size place the grid in space (Angstrom
+# for the density output). bricklets is only the decomposition hint VisIt uses, the .dat is still one brick
+BovHeader = namedtuple('BovHeader', ['path', 'time', 'data_file', 'data_size', 'data_format', 'variable',
+                                     'endian', 'centering', 'brick_origin', 'brick_size', 'components', 'bricklets',
+                                     'byte_offset'])
+
+# data is a read-only memmap indexed [x, y, z] (and [x, y, z, component] with more than one component)
+DensityGrid = namedtuple('DensityGrid', ['header', 'data'])
+
+
+def read_bov_header(bov_path):
+    # "KEY: value" lines, keys as VisIt writes them (case and surrounding spaces ignored)
+    fields = {}
+    with open(bov_path, 'r') as file:
+        for line in file:
+            line = line.split('#')[0]
+            if ':' in line:
+                key, value = line.split(':', 1)
+                fields[key.strip().upper()] = value.strip()
+
+    for key in ('DATA_FILE', 'DATA_SIZE', 'DATA_FORMAT'):
+        if key not in fields:
+            raise ValueError(f"{bov_path} has no {key}: line")
+    data_format = fields['DATA_FORMAT'].upper()
+    if data_format not in DATA_FORMATS:
+        raise ValueError(f"Unsupported DATA_FORMAT {data_format} in {bov_path}")
+    data_size = tuple(int(value) for value in fields['DATA_SIZE'].split())
+    if len(data_size) != 3:
+        raise ValueError(f"DATA_SIZE in {bov_path} must have 3 values, got {fields['DATA_SIZE']}")
+
+    def floats(key, default):
+        return tuple(float(value) for value in fields[key].split()) if key in fields else default
+
+    return BovHeader(
+        path=bov_path,
+        time=float(fields['TIME']) if 'TIME' in fields else np.nan,
+        data_file=os.path.join(os.path.dirname(bov_path), fields['DATA_FILE']),
+        data_size=data_size,
+        data_format=data_format,
+        variable=fields.get('VARIABLE', ''),
+        endian=fields.get('DATA_ENDIAN', 'LITTLE').upper(),
+        centering=fields.get('CENTERING', 'zonal').lower(),
+        brick_origin=floats('BRICK_ORIGIN', (0.0, 0.0, 0.0)),
+        brick_size=floats('BRICK_SIZE', tuple(float(n) for n in data_size)),
+        components=int(fields.get('DATA_COMPONENTS', 1)),
+        bricklets=tuple(int(value) for value in fields['DATA_BRICKLETS'].split()) if 'DATA_BRICKLETS' in fields
+        else data_size,
+        byte_offset=int(fields.get('BYTE_OFFSET', 0)),
+    )
+
+
+def data_dtype(header):
+    return np.dtype(('>' if header.endian == 'BIG' else '<') + DATA_FORMATS[header.data_format])
+
+
+def open_bov(bov_path):
+    """
+    Opens one time step. The .dat is memory-mapped, nothing is read until the array is used. BOV stores x fastest,
+    so the map is Fortran ordered and indexed [x, y, z].
+    """
+    header = read_bov_header(bov_path)
+    if header.components > 1:
+        # components are interleaved per point, so the component index varies fastest
+        data = np.memmap(header.data_file, dtype=data_dtype(header), mode='r', offset=header.byte_offset,
+                         shape=(header.components,) + header.data_size, order='F')
+        data = np.moveaxis(data, 0, -1)
+    else:
+        data = np.memmap(header.data_file, dtype=data_dtype(header), mode='r', offset=header.byte_offset,
+                         shape=header.data_size, order='F')
+    return DensityGrid(header, data)
+
+
+def grid_spacing(header):
+    # Distance between neighbouring grid points along x, y, z
+    size = np.array(header.brick_size)
+    points = np.array(header.data_size)
+    return size / np.maximum(points - 1, 1) if header.centering == 'nodal' else size / points
+
+
+def grid_axes(header):
+    # Coordinates of the grid points along x, y and z (cell centres for zonal data)
+    spacing = grid_spacing(header)
+    shift = 0.0 if header.centering == 'nodal' else 0.5
+    return [origin + (np.arange(points) + shift) * step
+            for origin, points, step in zip(header.brick_origin, header.data_size, spacing)]
+
+
+def voxel_volume(header):
+    return float(np.prod(grid_spacing(header)))
+
+
+class DensitySeries:
+    """
+    Every dens#####.bov of a run directory as a lazily loaded 4D (time x X x Y x Z) sequence. Only the headers are
+    read up front. series[i] memory-maps time step i, series[i:j] gives a list of them, and stack() reads a set of
+    time steps into one 4D array.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        matches = [(int(match.group(1)), name) for name in os.listdir(directory)
+                   for match in [BOV_PATTERN.match(name)] if match]
+        if not matches:
+            raise FileNotFoundError(f"No dens#####.bov files in {directory}")
+        self.steps = np.array([step for step, _ in sorted(matches)])
+        self.headers = [read_bov_header(os.path.join(directory, name)) for _, name in sorted(matches)]
+        sizes = {header.data_size for header in self.headers}
+        if len(sizes) > 1:
+            raise ValueError(f"Time steps in {directory} have different grid sizes {sorted(sizes)}")
+
+    def __len__(self):
+        return len(self.headers)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [open_bov(header.path) for header in self.headers[item]]
+        return open_bov(self.headers[item].path)
+
+    def __iter__(self):
+        for header in self.headers:
+            yield open_bov(header.path)
+
+    @property
+    def shape(self):
+        return (len(self),) + self.headers[0].data_size
+
+    @property
+    def times(self):
+        return np.array([header.time for header in self.headers])
+
+    def stack(self, indices=None):
+        # Reads the given time steps (default all) into one (time x X x Y x Z) array
+        indices = range(len(self)) if indices is None else indices
+        return np.stack([np.asarray(self[index].data) for index in indices])
@@ -0,0 +1,129 @@
+# Electron density integrated around every atom over time: streams through the dens#####.dat grids of a run,
+# one grid per worker process, with the atom positions taken from the matching trajectory.xyz frame
+# Run from the repository root: python -m density_grid.regional_density
+# Author: Samuel S. Taylor
+
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+from scipy.spatial import cKDTree
+
+from density_grid.bov_reader import DensitySeries, open_bov, grid_axes, voxel_volume
+from trajectory_xyz.trajectory_cache import load_trajectory
+
+DENSITY_INTERVAL = 500  # iterations between two dens##### outputs (dens00003 is iteration 1500)
+SLAB_POINTS = 1 << 21  # grid points assigned to atoms at a time, bounds the memory next to the grid itself
+METHODS = ('voronoi', 'sphere')
+
+# electrons is (time x atoms): the density integrated over each atom's region. outside is what is in no region
+# (always 0 for voronoi) and total the whole grid, both (time)
+RegionalDensity = namedtuple('RegionalDensity', ['steps', 'iterations', 'times', 'symbols', 'method', 'electrons',
+                                                 'outside', 'total'])
+
+
+def integrate_regions(bov_path, positions, method='voronoi', radius=1.0, slab_points=SLAB_POINTS):
+    """
+    Integrates one density grid over the region of every atom in positions (atoms x 3). voronoi gives every grid point
+    to its nearest atom, sphere only the points within radius (Angstrom) of an atom, to the nearest one if spheres
+    overlap. The grid is walked in z slabs, so only the slab's point coordinates are built at a time. Returns
+    (electrons per atom, outside, total).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown region method '{method}', use one of {METHODS}")
+    grid = open_bov(bov_path)
+    x, y, z = grid_axes(grid.header)
+    num_atoms = len(positions)
+    tree = cKDTree(positions)
+    upper_bound = radius if method == 'sphere' else np.inf
+
+    sums = np.zeros(num_atoms + 1)  # the last entry collects the points outside every sphere
+    plane_points = len(x) * len(y)
+    slab_planes = max(1, slab_points // plane_points)
+    plane_x, plane_y = np.meshgrid(x, y, indexing='ij')
+    for start in range(0, len(z), slab_planes):
+        stop = min(start + slab_planes, len(z))
+        density = np.asarray(grid.data[:, :, start:stop], dtype=np.float64)
+        points = np.empty(density.shape + (3,))
+        points[..., 0] = plane_x[:, :, None]
+        points[..., 1] = plane_y[:, :, None]
+        points[..., 2] = z[None, None, start:stop]
+        _, nearest = tree.query(points.reshape(-1, 3), distance_upper_bound=upper_bound)
+        sums += np.bincount(nearest, weights=density.reshape(-1), minlength=num_atoms + 1)
+
+    volume = voxel_volume(grid.header)
+    electrons = sums[:num_atoms] * volume
+    return electrons, sums[num_atoms] * volume, sums.sum() * volume
+
+
+def frame_for_iterations(trajectory_iterations, iterations):
+    # Index of the trajectory frame nearest to each density iteration
+    if len(trajectory_iterations) == 1:
+        return np.zeros(len(iterations), dtype=np.int64)
+    order = np.argsort(trajectory_iterations)
+    sorted_iterations = trajectory_iterations[order]
+    index = np.clip(np.searchsorted(sorted_iterations, iterations), 1, len(sorted_iterations) - 1)
+    previous_closer = (iterations - sorted_iterations[index - 1]) <= (sorted_iterations[index] - iterations)
+    return order[np.where(previous_closer, index - 1, index)]
+
+
+def regional_density(run_directory, method='voronoi', radius=1.0, processes=None,
+                     density_interval=DENSITY_INTERVAL):
+    """
+    (time x atoms) table of the electrons around every atom for every dens#####.bov in run_directory, with the
+    positions from run_directory/trajectory.xyz. The time steps are spread over a process pool (processes=1 runs
+    them here), each worker holding one grid at a time.
+    """
+    series = DensitySeries(run_directory)
+    trajectory = load_trajectory(os.path.join(run_directory, 'trajectory.xyz'))
+    iterations = series.steps * density_interval
+    frames = frame_for_iterations(trajectory.iterations, iterations)
+    mismatched = trajectory.iterations[frames] != iterations
+    if mismatched.any():
+        print(f"  {mismatched.sum()} density steps have no trajectory frame at their iteration, using the nearest")
+
+    paths = [header.path for header in series.headers]
+    positions = [np.asarray(trajectory.positions[frame]) for frame in frames]
+    arguments = (paths, positions, repeat(method), repeat(radius))
+    if processes == 1:
+        results = list(map(integrate_regions, *arguments))
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(integrate_regions, *arguments))
+
+    electrons = np.array([result[0] for result in results]).reshape(len(results), len(trajectory.symbols))
+    outside = np.array([result[1] for result in results])
+    total = np.array([result[2] for result in results])
+    # Frames whose time[fs] field overflowed (long runs) have NaN times, those are taken from the iteration instead
+    times = trajectory.times[frames]
+    times = np.where(np.isnan(times), trajectory.iterations[frames] / 1000, times)
+    return RegionalDensity(series.steps, iterations, times, trajectory.symbols, method, electrons, outside, total)
+
+
+def write_region_table(filepath, result):
+    # One row per density step: step, iteration, time, electrons around each atom, outside, total
+    atoms = [f"{symbol}[{i}]" for i, symbol in enumerate(result.symbols)]
+    with open(filepath, 'w') as file:
+        file.write(", ".join(["step", "iteration", "time[fs]"] + atoms + ["outside", "total"]) + "\n")
+        for i in range(len(result.steps)):
+            values = [f"{value:.6f}" for value in result.electrons[i]] + [f"{result.outside[i]:.6f}",
+                                                                          f"{result.total[i]:.6f}"]
+            file.write(", ".join([str(result.steps[i]), str(result.iterations[i]), str(result.times[i])] + values)
+                       + "\n")
+
+
+def main():
+    run_directory = "C4H10/kinked/pulse_7_5runs/traj_dens/traj_dens_r49"
+    output_file = os.path.join(run_directory, "regional_density.csv")
+    method = 'voronoi'  # 'voronoi' (every grid point to its nearest atom) or 'sphere'
+    radius = 1.0  # sphere radius in Angstrom
+    processes = None  # worker processes (None uses every core)
+
+    result = regional_density(run_directory, method=method, radius=radius, processes=processes)
+    write_region_table(output_file, result)
+    print("Integrated", len(result.steps), "density steps, table written to", output_file)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+# Bootstrap confidence intervals for fragment yields and average charges, resampling whole simulation blocks
+# Author: Samuel S. Taylor
+
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from histograms_stats_molecule_formation.fragment_histogram import flatten_fragment_data
+
+# Most resamples drawn per chunk
+RESAMPLE_CHUNK = 1000
+# Most (resample, block) entries per chunk. A chunk holds its int64 draws, their int64 counts and the float64 weight
+# matrix at once, about 24 bytes per entry, so this caps a chunk near 50 MB however many blocks there are
+CHUNK_ELEMENTS = 1 << 21
+# Below this many resamples the pool start up costs more than it saves
+PARALLEL_MIN_RESAMPLES = 20000
+
+# Per fragment point estimates and percentile intervals, aligned with fragments. yields are percentages of all
+# fragments, averages are over the non-zero charges (as in the bar charts). average_low / average_high are NaN for
+# fragments that never had a non-zero charge.
+BootstrapIntervals = namedtuple('BootstrapIntervals', ['fragments', 'num_resamples', 'confidence',
+                                                       'yields', 'yield_low', 'yield_high',
+                                                       'averages', 'average_low', 'average_high'])
+
+
+def block_fragment_sums(fragments_data, fragment_blocks):
+    """
+    Collapses {fragment: [values]} and the matching {fragment: [block index]} into (blocks x fragments) matrices of
+    fragment counts, value sums and non-zero counts. The bootstrap only ever needs these per block sums.
+    """
+    fragments, codes, values = flatten_fragment_data(fragments_data)
+    _, block_codes, blocks = flatten_fragment_data({fragment: fragment_blocks[fragment] for fragment in fragments})
+    if len(blocks) != len(values) or not np.array_equal(block_codes, codes):
+        raise ValueError("fragment_blocks does not line up with fragments_data")
+
+    # Only blocks that produced at least one fragment take part, numbered 0..num_blocks-1
+    _, blocks = np.unique(blocks.astype(np.int64), return_inverse=True)
+    num_blocks = blocks.max() + 1 if len(blocks) else 0
+    num_fragments = len(fragments)
+
+    flat_index = blocks.reshape(-1) * num_fragments + codes
+    size = num_blocks * num_fragments
+    counts = np.bincount(flat_index, minlength=size).reshape(num_blocks, num_fragments)
+    sums = np.bincount(flat_index, weights=values, minlength=size).reshape(num_blocks, num_fragments)
+    nonzero = np.bincount(flat_index[values != 0], minlength=size).reshape(num_blocks, num_fragments)
+    return fragments, counts, sums, nonzero
+
+
+def _yields_and_averages(counts, sums, nonzero):
+    # Works on one row per (re)sample: (samples x fragments) -> yields in %, averages over the non-zero values
+    totals = counts.sum(axis=1, keepdims=True)
+    yields = np.divide(counts * 100.0, totals, out=np.zeros(counts.shape), where=totals > 0)
+    averages = np.divide(sums, nonzero, out=np.full(sums.shape, np.nan), where=nonzero > 0)
+    return yields, averages
+
+
+def _bootstrap_chunk(counts, sums, nonzero, num_resamples, seed):
+    """
+    Draws num_resamples block resamples. Resample r is stored as weights[r, b], the number of times block b was
+    drawn, so the resampled per fragment sums are one matrix product instead of a gather over the drawn blocks.
+    """
+    rng = np.random.default_rng(seed)
+    num_blocks = counts.shape[0]
+    draws = rng.integers(0, num_blocks, size=(num_resamples, num_blocks))
+    draws += np.arange(num_resamples)[:, None] * num_blocks
+    weights = np.bincount(draws.ravel(), minlength=num_resamples * num_blocks).reshape(num_resamples, num_blocks)
+    weights = weights.astype(np.float64)
+    return _yields_and_averages(weights @ counts, weights @ sums, weights @ nonzero)
+
+
+def resample_chunk_size(num_blocks):
+    # Resamples per chunk: RESAMPLE_CHUNK, fewer when that many (resamples x blocks) entries exceed CHUNK_ELEMENTS
+    return max(1, min(RESAMPLE_CHUNK, CHUNK_ELEMENTS // max(num_blocks, 1)))
+
+
+def _bootstrap_chunk_args(args):
+    return _bootstrap_chunk(*args)
+
+
+def bootstrap_fragment_stats(fragments_data, fragment_blocks, num_resamples=2000, confidence=95, seed=None,
+                             processes=None):
+    """
+    Percentile bootstrap of every fragment's yield and average charge. Simulation blocks are resampled with
+    replacement (fragments from the same simulation are not independent), in chunks of resample_chunk_size resamples
+    with their own child seeds, so a given seed gives the same intervals whether or not the chunks run in a process
+    pool. The pool is used once num_resamples reaches PARALLEL_MIN_RESAMPLES (processes=1 turns it off).
+    """
+    if num_resamples < 1:
+        raise ValueError("num_resamples must be at least 1")
+    if not 0 < confidence < 100:
+        raise ValueError("confidence must be a percentage between 0 and 100")
+
+    fragments, counts, sums, nonzero = block_fragment_sums(fragments_data, fragment_blocks)
+    if counts.shape[0] == 0:
+        raise ValueError("No fragments to bootstrap")
+    yields, averages = _yields_and_averages(counts.sum(axis=0)[None, :], sums.sum(axis=0)[None, :],
+                                            nonzero.sum(axis=0)[None, :])
+
+    chunk_size = resample_chunk_size(counts.shape[0])
+    chunk_sizes = [chunk_size] * (num_resamples // chunk_size)
+    if num_resamples % chunk_size:
+        chunk_sizes.append(num_resamples % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    chunks = [(counts, sums, nonzero, size, chunk_seed) for size, chunk_seed in zip(chunk_sizes, seeds)]
+
+    processes = processes or os.cpu_count() or 1
+    if num_resamples >= PARALLEL_MIN_RESAMPLES and processes > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(_bootstrap_chunk_args, chunks))
+    else:
+        results = [_bootstrap_chunk_args(chunk) for chunk in chunks]
+
+    resampled_yields = np.concatenate([result[0] for result in results])
+    resampled_averages = np.concatenate([result[1] for result in results])
+
+    tail = (100 - confidence) / 2
+    yield_low, yield_high = np.percentile(resampled_yields, [tail, 100 - tail], axis=0)
+    # A resample can miss every non-zero charge of a rare fragment, those resamples are left out of its interval
+    average_low = np.full(len(fragments), np.nan)
+    average_high = np.full(len(fragments), np.nan)
+    has_average = ~np.all(np.isnan(resampled_averages), axis=0)
+    if has_average.any():
+        average_low[has_average], average_high[has_average] = np.nanpercentile(
+            resampled_averages[:, has_average], [tail, 100 - tail], axis=0)
+
+    return BootstrapIntervals(fragments, num_resamples, confidence, yields[0], yield_low, yield_high,
+                              np.nan_to_num(averages[0]), average_low, average_high)
+
+
+def yield_errors(intervals, fragments):
+    # (2 x len(fragments)) yerr for plt.bar / plt.errorbar: distance from each yield down / up to its interval
+    index = [intervals.fragments.index(fragment) for fragment in fragments]
+    yields = intervals.yields[index]
+    return np.array([yields - intervals.yield_low[index], intervals.yield_high[index] - yields]).clip(min=0)
+
+
+def abs_average_errors(intervals, fragments):
+    """
+    (2 x len(fragments)) yerr for the stacked average charge bars, which are drawn with abs(average). For negative
+    averages the interval is mirrored the same way. Fragments without an interval get no error bar (0).
+    """
+    index = [intervals.fragments.index(fragment) for fragment in fragments]
+    averages = intervals.averages[index]
+    sign = np.where(averages < 0, -1.0, 1.0)
+    low = np.minimum(sign * intervals.average_low[index], sign * intervals.average_high[index])
+    high = np.maximum(sign * intervals.average_low[index], sign * intervals.average_high[index])
+    errors = np.array([np.abs(averages) - low, high - np.abs(averages)])
+    return np.nan_to_num(errors).clip(min=0)
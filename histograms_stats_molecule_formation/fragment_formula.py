@@ -0,0 +1,140 @@
+# Fragment formula parsing and valence electron -> charge conversion shared by the fragment statistics scripts
+# Author: Samuel S. Taylor
+
+import re
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+
+# Valence electrons of the neutral atom (main group elements up to argon)
+VALENCE_ELECTRONS = {
+    'H': 1, 'He': 2,
+    'Li': 1, 'Be': 2, 'B': 3, 'C': 4, 'N': 5, 'O': 6, 'F': 7, 'Ne': 8,
+    'Na': 1, 'Mg': 2, 'Al': 3, 'Si': 4, 'P': 5, 'S': 6, 'Cl': 7, 'Ar': 8,
+}
+
+ELEMENT_PATTERN = re.compile(r'([A-Z][a-z]?)(\d*)')
+
+# Parsed composition of one fragment formula. heteroatoms holds every element other than C and H as
+# ((element, count), ...). sort_key orders fragments the way the plots list them: H first, then bare carbon
+# chains (C, C2, ...), then hydrocarbons by carbon and hydrogen count, then anything containing other elements.
+FragmentInfo = namedtuple('FragmentInfo', ['formula', 'carbons', 'hydrogens', 'heteroatoms', 'sort_key'])
+
+
+@lru_cache(maxsize=None)
+def parse_formula(formula):
+    """
+    Parses a fragment formula into ((element, count), ...) in the order the elements are written,
+    e.g. "C2H5" -> (('C', 2), ('H', 5)), "CHO" -> (('C', 1), ('H', 1), ('O', 1)).
+    """
+    composition = {}
+    end = 0
+    for match in ELEMENT_PATTERN.finditer(formula):
+        if match.start() != end:
+            break
+        element, count = match.group(1), match.group(2)
+        composition[element] = composition.get(element, 0) + (int(count) if count else 1)
+        end = match.end()
+    if end != len(formula) or not composition:
+        raise ValueError(f"Could not parse fragment formula '{formula}'")
+    return tuple(composition.items())
+
+
+@lru_cache(maxsize=None)
+def neutral_valence_electrons(formula):
+    total = 0
+    for element, count in parse_formula(formula):
+        if element not in VALENCE_ELECTRONS:
+            raise ValueError(f"No valence electron count for element '{element}' in fragment '{formula}'")
+        total += VALENCE_ELECTRONS[element] * count
+    return total
+
+
+def valence_electrons_to_charges(fragments, valence_electrons):
+    # Vectorised over a whole fragment table: charge = neutral valence electrons - valence electrons on the fragment
+    formulas, inverse = np.unique(fragments, return_inverse=True)
+    neutral_counts = np.array([neutral_valence_electrons(str(formula)) for formula in formulas], dtype=np.float64)
+    return neutral_counts[inverse] - np.asarray(valence_electrons, dtype=np.float64)
+
+
+def valence_to_charges(fragment_charges):
+    # In place on a {fragment: [valence electrons]} dict, as returned by process_fragments
+    for key, array in fragment_charges.items():
+        fragment_charges[key] = (neutral_valence_electrons(key) - np.asarray(array, dtype=np.float64)).tolist()
+
+
+@lru_cache(maxsize=None)
+def fragment_info(formula):
+    try:
+        composition = dict(parse_formula(formula))
+    except ValueError:
+        # Not a formula we understand, list it after everything else
+        return FragmentInfo(formula, 0, 0, (), (4, 0, 0, (), formula))
+
+    carbons = composition.pop('C', 0)
+    hydrogens = composition.pop('H', 0)
+    heteroatoms = tuple(sorted(composition.items()))
+    if heteroatoms:
+        group = 3
+    elif carbons == 0:
+        group = 0
+    elif hydrogens == 0:
+        group = 1
+    else:
+        group = 2
+    return FragmentInfo(formula, carbons, hydrogens, heteroatoms, (group, carbons, hydrogens, heteroatoms, formula))
+
+
+class FragmentRegistry:
+    """
+    Interns fragment formulas as small integer codes so fragment columns can be handled as integer NumPy arrays.
+    Each formula is parsed once when it is first registered, and the canonical plot order is kept as a rank per
+    code, so ordering any set of fragments is a single argsort.
+    """
+
+    def __init__(self):
+        self.formulas = []
+        self.info = []
+        self._codes = {}
+        self._ranks = None
+
+    def __len__(self):
+        return len(self.formulas)
+
+    def code(self, formula):
+        code = self._codes.get(formula)
+        if code is None:
+            code = len(self.formulas)
+            self._codes[formula] = code
+            self.formulas.append(formula)
+            self.info.append(fragment_info(formula))
+            self._ranks = None
+        return code
+
+    def encode(self, fragments):
+        # Array of formula strings -> array of codes (one np.unique over the strings, then a table lookup)
+        formulas, inverse = np.unique(np.asarray(fragments, dtype=str), return_inverse=True)
+        lookup = np.array([self.code(str(formula)) for formula in formulas], dtype=np.int32)
+        return lookup[inverse.reshape(-1)].reshape(np.shape(fragments))
+
+    def decode(self, codes):
+        return [self.formulas[code] for code in np.asarray(codes).tolist()]
+
+    def sort_key(self, formula):
+        return self.info[self.code(formula)].sort_key
+
+    def ranks(self):
+        # ranks()[code] is the position of that fragment in the canonical plot order
+        if self._ranks is None:
+            order = sorted(range(len(self.formulas)), key=lambda code: self.info[code].sort_key)
+            self._ranks = np.empty(len(order), dtype=np.int32)
+            self._ranks[order] = np.arange(len(order), dtype=np.int32)
+        return self._ranks
+
+    def sort_order(self, codes):
+        # Indices that put codes into the canonical plot order
+        return np.argsort(self.ranks()[np.asarray(codes, dtype=np.int64)], kind='stable')
+
+
+# Registry shared by the plotting scripts
+FRAGMENTS = FragmentRegistry()
@@ -0,0 +1,72 @@
+# Single-pass histogram engine for per-fragment charge / speed distributions used by the fragment statistics plots
+# Author: Samuel S. Taylor
+
+from collections import namedtuple
+import numpy as np
+
+# counts[f, b] is the number of values of fragments[f] in bin b (bins are the bin edges). totals, sums and nonzero
+# hold, per fragment, the number of values, their sum, and how many of them are non-zero.
+FragmentHistogram = namedtuple('FragmentHistogram', ['fragments', 'bins', 'counts', 'totals', 'sums', 'nonzero'])
+
+
+def flatten_fragment_data(fragments_data):
+    """
+    {fragment: [values]} -> (fragments, codes, values): the fragment names in dict order, and two flat arrays
+    holding every value together with the index of its fragment in fragments.
+    """
+    fragments = list(fragments_data.keys())
+    lengths = [len(values) for values in fragments_data.values()]
+    codes = np.repeat(np.arange(len(fragments)), lengths)
+    if fragments:
+        values = np.concatenate([np.asarray(values, dtype=np.float64) for values in fragments_data.values()])
+    else:
+        values = np.empty(0, dtype=np.float64)
+    return fragments, codes, values
+
+
+def histogram_matrix(codes, values, num_fragments, bins):
+    """
+    Bins every (fragment code, value) pair at once with a single bincount and returns the dense
+    (num_fragments x len(bins) - 1) count matrix. Same bin edge rules as np.histogram: bins are half open except
+    for the last one, and values outside the edges are dropped.
+    """
+    bins = np.asarray(bins, dtype=np.float64)
+    num_bins = len(bins) - 1
+    bin_index = np.searchsorted(bins, values, side='right') - 1
+    bin_index[values == bins[-1]] = num_bins - 1
+    inside = (bin_index >= 0) & (bin_index < num_bins)
+
+    flat_index = codes[inside] * num_bins + bin_index[inside]
+    counts = np.bincount(flat_index, minlength=num_fragments * num_bins)
+    return counts.reshape(num_fragments, num_bins)
+
+
+def fragment_histogram(fragments_data, bins=None):
+    """
+    Builds the FragmentHistogram for a {fragment: [values]} dict in one pass over the flattened values. With
+    bins=None only the per-fragment totals, sums and non-zero counts are computed (counts is None).
+    """
+    fragments, codes, values = flatten_fragment_data(fragments_data)
+    num_fragments = len(fragments)
+
+    counts = None
+    if bins is not None:
+        bins = np.asarray(bins, dtype=np.float64)
+        counts = histogram_matrix(codes, values, num_fragments, bins)
+
+    totals = np.bincount(codes, minlength=num_fragments)
+    sums = np.bincount(codes, weights=values, minlength=num_fragments)
+    nonzero = np.bincount(codes[values != 0], minlength=num_fragments)
+    return FragmentHistogram(fragments, bins, counts, totals, sums, nonzero)
+
+
+def average_nonzero(histogram):
+    # Per-fragment average over the non-zero values (0 for fragments whose values are all zero)
+    return np.divide(histogram.sums, histogram.nonzero, out=np.zeros(len(histogram.fragments)),
+                     where=histogram.nonzero > 0)
+
+
+def fragment_percentages(histogram, fragment):
+    # Bin counts of one fragment as a percentage of that fragment's values that fell inside the bins
+    row = histogram.counts[histogram.fragments.index(fragment)]
+    return row / max(row.sum(), 1) * 100
@@ -1,112 +1,49 @@
-import csv
+# Run from the repository root: python -m histograms_stats_molecule_formation.fragments_stats_plots
 import matplotlib.pyplot as plt
 import numpy as np
-import re
 import os
 
+from histograms_stats_molecule_formation.molecule_formation_cache import load_fragment_table, group_by_fragment
+from histograms_stats_molecule_formation.fragment_formula import FRAGMENTS, valence_to_charges
+from histograms_stats_molecule_formation.fragment_histogram import (flatten_fragment_data, histogram_matrix,
+                                                                    fragment_histogram, average_nonzero,
+                                                                    fragment_percentages)
+from histograms_stats_molecule_formation.fragment_bootstrap import (bootstrap_fragment_stats, yield_errors,
+                                                                    abs_average_errors)
+
 
 # Do you want the histogram to display the number of charges opposed to valence electrons?
 VALENCE_ELECTRONS_TO_CHARGES = True
 INCLUDE_HYDROGEN = True
+# Number of block resamples for the error bars on the frequency / average charge plots (0 for no error bars)
+BOOTSTRAP_RESAMPLES = 2000
 
 def custom_sort(val):
     hydrocarbon, electrons = val
-    if hydrocarbon == "H":
-        return (0, 0, 0)
-    match = re.match(r"C(\d*)(H(\d*))?", hydrocarbon)
-    if match:
-        carbons = int(match.group(1)) if match.group(1) else 1
-        hydrogens = 0 if match.group(2) is None else (int(match.group(3)) if match.group(3) else 1)
-        if hydrogens == 0:
-            return (1, carbons, 0)
-        return (2, carbons, hydrogens)
-    return (3, 0, 0)  # Default case, should not happen with valid input
+    return FRAGMENTS.sort_key(hydrocarbon)
 
 def custom_sort_frags(hydrocarbon):
-    if hydrocarbon == "H":
-        return (0, 0, 0)
-    match = re.match(r"C(\d*)(H(\d*))?", hydrocarbon)
-    if match:
-        carbons = int(match.group(1)) if match.group(1) else 1
-        hydrogens = 0 if match.group(2) is None else (int(match.group(3)) if match.group(3) else 1)
-        if hydrogens == 0:
-            return (1, carbons, 0)
-        return (2, carbons, hydrogens)
-    return (3, 0, 0)  # Default case, should not happen with valid input
-
-def process_fragments(filepath,line_skip_num=9):
-     # line_skip_num is how many lines to skip to get to next frag and dens info
-
-    fragments_data = {}
-    
-    with open(filepath, 'r') as file:
-        reader = csv.reader(file)
-        lines = list(reader)
-    
-    for i in range(0, len(lines),line_skip_num):
-        fragments_line = lines[i]
-        densities_line = lines[i + 1]
-
-        fragments = [frag.split('[')[0].strip() for frag in fragments_line[1:] if frag.strip()]
-        densities = [float(density.strip()) for density in densities_line[1:] if density.strip()]
-
-        for fragment, density in zip(fragments, densities):
-            if fragment not in fragments_data:
-                fragments_data[fragment] = []
-            fragments_data[fragment].append(density)
-    print("Number of simulations:", (len(lines)/line_skip_num))
+    return FRAGMENTS.sort_key(hydrocarbon)
+
+def sort_fragments(fragments):
+    # Indices that put fragments into plot order (H, C, C2, ..., CH, CH2, ...) with one argsort over interned codes
+    return FRAGMENTS.sort_order(FRAGMENTS.encode(fragments))
+
+def process_fragments(filepath):
+    table = load_fragment_table(filepath)
+    fragments_data = group_by_fragment(table, 'densities', ~np.isnan(table['densities']))
+    print("Number of simulations:", len(table['run_ids']))
     return fragments_data
 
-def valence_to_charges(fragment_charges):
-        
-    # Dictionary to store neutral molecule valence electron counts
-    C_valence_electrons = 4
-    H_electrons = 1
-
-    neutral_counts_no_sub = {
-        "C":    (1 * C_valence_electrons) + (0 * H_electrons),
-        "H":    (0 * C_valence_electrons) + (1 * H_electrons),
-        "CH":   (1 * C_valence_electrons) + (1 * H_electrons),
-        "CH2":  (1 * C_valence_electrons) + (2 * H_electrons),
-        "CH3":  (1 * C_valence_electrons) + (3 * H_electrons),
-        "C2":   (2 * C_valence_electrons) + (0 * H_electrons),
-        "C2H":  (2 * C_valence_electrons) + (1 * H_electrons),
-        "C2H2": (2 * C_valence_electrons) + (2 * H_electrons),
-        "C2H3": (2 * C_valence_electrons) + (3 * H_electrons),
-        "C2H4": (2 * C_valence_electrons) + (4 * H_electrons),
-        "C2H5": (2 * C_valence_electrons) + (5 * H_electrons),
-        "C3":   (3 * C_valence_electrons) + (0 * H_electrons),
-        "C3H":  (3 * C_valence_electrons) + (1 * H_electrons),
-        "C3H2": (3 * C_valence_electrons) + (2 * H_electrons),
-        "C3H3": (3 * C_valence_electrons) + (3 * H_electrons),
-        "C3H4": (3 * C_valence_electrons) + (4 * H_electrons),
-        "C3H5": (3 * C_valence_electrons) + (5 * H_electrons),
-        "C3H6": (3 * C_valence_electrons) + (6 * H_electrons),
-        "C3H7": (3 * C_valence_electrons) + (7 * H_electrons),
-        "C4":   (4 * C_valence_electrons) + (0 * H_electrons),
-        "C4H":  (4 * C_valence_electrons) + (1 * H_electrons),
-        "C4H2": (4 * C_valence_electrons) + (2 * H_electrons),
-        "C4H3": (4 * C_valence_electrons) + (3 * H_electrons),
-        "C4H4": (4 * C_valence_electrons) + (4 * H_electrons),
-        "C4H5": (4 * C_valence_electrons) + (5 * H_electrons),
-        "C4H6": (4 * C_valence_electrons) + (6 * H_electrons),
-        "C4H7": (4 * C_valence_electrons) + (7 * H_electrons),
-        "C4H8": (4 * C_valence_electrons) + (8 * H_electrons),
-        "C4H9": (4 * C_valence_electrons) + (9 * H_electrons),
-        "C4H10":(4 * C_valence_electrons) + (10 * H_electrons)
-
-    }
-
-    #neutral_counts= {}
-    
-    
-    # for molecule in neutral_counts_no_sub:
-    #     neutral_counts[subscript_numbers(molecule)] = neutral_counts_no_sub[molecule]
+def process_fragment_blocks(filepath):
+    # {fragment: [index of the simulation block of each value]}, lined up with the lists from process_fragments
+    table = load_fragment_table(filepath)
+    return group_by_fragment(table, 'block_index', ~np.isnan(table['densities']))
 
-    # Calculate charges and store them in a dictionary
-    for key, array in fragment_charges.items():
-        updated_values = [neutral_counts_no_sub[key] - x for x in array]
-        fragment_charges[key] = updated_values
+def draw_error_bars(ax, bars, tops, yerr):
+    # Error bars at the top of each bar (tops are the bar tops, yerr is (2 x bars) distances down / up)
+    x = [bar.get_x() + bar.get_width() / 2 for bar in bars]
+    ax.errorbar(x, tops, yerr=yerr, fmt='none', ecolor='black', elinewidth=.8, capsize=2)
 
 def subscript_numbers(molecule):
     subscript_map = str.maketrans("0123456789", "₀₁₂₃₄₅₆₇₈₉")
@@ -123,14 +60,12 @@ def plot_charge_states(fragments_data_passed,fig_name="frag_charge_states.png"):
     if not(include_hydrogen_in_this_plot):
         fragments_data.pop("H")
         
-    # Fragment names
-    fragments = list(fragments_data.keys())
-    
+    # Fragment names, and every charge flattened together with the index of its fragment
+    fragments, codes, charges = flatten_fragment_data(fragments_data)
+
     # Calculate the minimum and maximum electron to set up the bins
-    min_charge = min(min(charge) for charge in fragments_data.values() if charge)
-    max_charge = max(max(charge) for charge in fragments_data.values() if charge)
-    min_charge = ((min_charge * 10) // 1 ) / 10 #round charges off to 1 decimal
-    max_charge = ((max_charge * 10) // 1 ) / 10
+    min_charge = ((charges.min() * 10) // 1) / 10  # round charges off to 1 decimal
+    max_charge = ((charges.max() * 10) // 1) / 10
 
     eps=1E-9 #eps to include the charges that are equal to the max_charge
     bin_size = .2
@@ -138,19 +73,11 @@ def plot_charge_states(fragments_data_passed,fig_name="frag_charge_states.png"):
     labels = [f"{bins[i]:.1f} to {bins[i+1]:.1f}" for i in range(len(bins) - 1)]
     colors = plt.cm.viridis(np.linspace(0, 1, len(labels)))
 
-    total_num_fragments = 0
-    for key in fragments_data.values():
-        for _ in key:
-            total_num_fragments += 1
+    total_num_fragments = len(charges)
 
-    # Prepare data for plotting
-    bar_data = {label: [] for label in labels}  # Initialize dictionary for each label
-    fragments = list(fragments_data.keys())
-    for fragment in fragments:
-        # Bin the data for each fragment
-        counts, _ = np.histogram(fragments_data[fragment], bins=bins)
-        for label, count in zip(labels, counts):
-            bar_data[label].append((count/total_num_fragments) * 100)
+    # Prepare data for plotting: column j of the (fragments x bins) matrix is the bar for labels[j]
+    counts = histogram_matrix(codes, charges, len(fragments), bins)
+    bar_data = {label: (counts[:, j] / total_num_fragments) * 100 for j, label in enumerate(labels)}
 
     # Plotting
     bar_width = 0.8
@@ -184,7 +111,7 @@ def plot_charge_states(fragments_data_passed,fig_name="frag_charge_states.png"):
     plt.ylabel('Frequency (%)', fontsize=16, fontweight='bold')
     #plt.title('Fragment Product Frequency and Charge States', fontweight='bold', fontsize=20)
     
-    sorted_fragments = sorted(fragments, key=custom_sort_frags)
+    sorted_fragments = [fragments[i] for i in sort_fragments(fragments)]
     subscripted_fragments = [subscript_numbers(frag) for frag in sorted_fragments]
     plt.xticks(r, subscripted_fragments, rotation=45, fontsize='12',fontweight='bold')
     plt.yticks(fontweight='bold', fontsize='12')
@@ -197,47 +124,32 @@ def plot_charge_states(fragments_data_passed,fig_name="frag_charge_states.png"):
     plt.savefig(fig_name, format='png')  # Save as PNG
     plt.close()
 
-def plot_fragment_counts_and_averages_log(fragments_data, fig_name = 'frag_charge_averages.png', log_scale=True):
-    # Extract fragment names
-    fragments = list(fragments_data.keys())
-    counts = []
-    averages = []
-    total_num_frags = 0
-    
-    # Calculate counts and averages for each fragment
-    for fragment in fragments:
-        # if fragment == "H":
-        #     counts.append(0)
-        # else:
-        #     count = len(fragments_data[fragment])
-        #     counts.append(count)
-        #     total_num_frags += count
-
-        count = len(fragments_data[fragment])
-        counts.append(count)
-        total_num_frags += count
-        
-        charge_sum = sum(fragments_data[fragment])
-        num_frag = len([x for x in fragments_data[fragment] if x != 0])
-        if num_frag != 0:
-            average = charge_sum / num_frag
-            averages.append(average)
-    
-    frequency = [(x / total_num_frags) * 100 for x in counts]
-    counts = frequency
+def plot_fragment_counts_and_averages_log(fragments_data, fig_name = 'frag_charge_averages.png', log_scale=True, intervals=None):
+    # Counts and averages (over the non-zero charges) for every fragment in one pass
+    histogram = fragment_histogram(fragments_data)
+    fragments = histogram.fragments
+    total_num_frags = histogram.totals.sum()
+    counts = (histogram.totals / total_num_frags * 100).tolist()
+    averages = average_nonzero(histogram).tolist()
 
     # Create the bar chart
     plt.figure(figsize=(10, 6))
 
-    sorted_fragments = sorted(fragments, key=custom_sort_frags)
+    order = sort_fragments(fragments)
+    sorted_fragments = [fragments[i] for i in order]
 
-    sorted_counts = [counts[fragments.index(frag)] for frag in sorted_fragments]
-    sorted_averages = [averages[fragments.index(frag)] for frag in sorted_fragments]
+    sorted_counts = [counts[i] for i in order]
+    sorted_averages = [averages[i] for i in order]
     
     bars_counts = plt.bar(sorted_fragments, sorted_counts, color='tab:blue', edgecolor='black', linewidth=.1, label='Frequency')
     abs_averages = [abs(x) for x in sorted_averages]
     bars_averages = plt.bar(sorted_fragments, abs_averages, color='#b0dce4', edgecolor='black', linewidth=.1, bottom=sorted_counts, label='Average Charge')
 
+    # Bootstrap intervals (from bootstrap_fragment_stats) on the frequency and on the average charge
+    if intervals is not None:
+        draw_error_bars(plt.gca(), bars_counts, sorted_counts, yield_errors(intervals, sorted_fragments))
+        draw_error_bars(plt.gca(), bars_averages, np.add(sorted_counts, abs_averages), abs_average_errors(intervals, sorted_fragments))
+
     #plt.xlabel('Fragments', fontsize=12, fontweight='bold')
     plt.ylabel('Frequency (%)', fontsize=12, fontweight='bold')
     plt.title('Fragment Product Frequency and Average Charge', fontsize=14, fontweight='bold')
@@ -276,45 +188,23 @@ def plot_fragment_counts_and_averages_log(fragments_data, fig_name = 'frag_charg
 def plot_fragment_counts_and_averages_two_ax(fragments_data, fig_name='frag_charge_averages.png', hydrogen_charge_scale_factor=10,
                                              fragment_freq_color='tab:blue', fragment_charge_color='#b0dce4',
                                              hydrogen_freq_color='tab:orange', hydrogen_charge_color='#ffc240',
-                                             inner_num_font_size=7, include_seperate_charge_leg_for_h=True):
-    # Extract fragment names
-    fragments = list(fragments_data.keys())
-    counts = []
-    averages = []
-    total_num_frags = 0
-    hydrogen_counts = 0
-    hydrogen_average = 0
-    
-    r = np.arange(len(fragments))  # the label locations
-    
-    # Calculate counts and averages for each fragment
-    for fragment in fragments:
-        count = len(fragments_data[fragment])
-        counts.append(count)
-        total_num_frags += count
-        
-        if fragment == "H":
-            hydrogen_counts += count
-        
-        charge_sum = sum(fragments_data[fragment])
-        num_frag = len([x for x in fragments_data[fragment] if x != 0])
-        if num_frag != 0:
-            average = charge_sum / num_frag
-            averages.append(average)
-            if fragment == "H":
-                hydrogen_average = average
-    
+                                             inner_num_font_size=7, include_seperate_charge_leg_for_h=True, intervals=None):
+    # Counts and averages (over the non-zero charges) for every fragment in one pass
+    histogram = fragment_histogram(fragments_data)
+    fragments = histogram.fragments
+    total_num_frags = histogram.totals.sum()
+
     print("Total number of fragments", total_num_frags)
-    frequency = [(x / total_num_frags) * 100 for x in counts]
-    hydrogen_frequency = (hydrogen_counts / total_num_frags) * 100
-    counts = frequency
+    counts = (histogram.totals / total_num_frags * 100).tolist()
+    averages = average_nonzero(histogram).tolist()
     print("Total frequency of fragments", sum(counts))
     
-    sorted_fragments = sorted(fragments, key=custom_sort_frags)
+    order = sort_fragments(fragments)
+    sorted_fragments = [fragments[i] for i in order]
     
     # Create / filter data for the graphs
-    sorted_counts = [counts[fragments.index(frag)] for frag in sorted_fragments]
-    sorted_averages = [averages[fragments.index(frag)] for frag in sorted_fragments]
+    sorted_counts = [counts[i] for i in order]
+    sorted_averages = [averages[i] for i in order]
     
     # Separate hydrogen data
     hydrogen_index = sorted_fragments.index("H") if "H" in sorted_fragments else None
@@ -344,6 +234,11 @@ def plot_fragment_counts_and_averages_two_ax(fragments_data, fig_name='frag_char
             hydrogen_bars_average = ax1.bar(["H"], [abs(hydrogen_average_charge) * hydrogen_charge_scale_factor], 
                                             color=fragment_charge_color, edgecolor='black', linewidth=.1, bottom=[hydrogen_count])
 
+        if intervals is not None:
+            draw_error_bars(ax1, hydrogen_bars_count, [hydrogen_count], yield_errors(intervals, ["H"]))
+            draw_error_bars(ax1, hydrogen_bars_average, [hydrogen_count + abs(hydrogen_average_charge) * hydrogen_charge_scale_factor],
+                            abs_average_errors(intervals, ["H"]) * hydrogen_charge_scale_factor)
+
         # Adding labels within the hydrogen bar for counts
         for bar in hydrogen_bars_count:
             height = bar.get_height()
@@ -360,6 +255,16 @@ def plot_fragment_counts_and_averages_two_ax(fragments_data, fig_name='frag_char
     abs_averages = [abs(x) for x in sorted_averages]
     bars_averages = ax2.bar(sorted_fragments, abs_averages, color=fragment_charge_color, edgecolor='black', linewidth=.1, bottom=sorted_counts, label='Fragment Average Charge')
 
+    if intervals is not None:
+        # Hydrogen is drawn on ax1, so leave its slot on ax2 without error bars
+        count_errors = yield_errors(intervals, sorted_fragments)
+        average_errors = abs_average_errors(intervals, sorted_fragments)
+        if hydrogen_index is not None:
+            count_errors[:, hydrogen_index] = 0
+            average_errors[:, hydrogen_index] = 0
+        draw_error_bars(ax2, bars_counts, sorted_counts, count_errors)
+        draw_error_bars(ax2, bars_averages, np.add(sorted_counts, abs_averages), average_errors)
+
     ax2.set_ylabel('Frequency (%)', fontsize=16, fontweight='bold', color=fragment_freq_color, fontname='Times New Roman')
     
     subscripted_fragments = [subscript_numbers(frag) for frag in sorted_fragments]
@@ -422,17 +327,18 @@ def plot_hydrogen(fragments_data, fig_name='hydrogen_charge_distribution.png'):
         # Calculate the total number of hydrogen charges
         total_hydrogen = len(hydrogen_charges)
         
+        # Bin with the histogram engine, the counts come back as percentages of the binned charges
+        bins = np.arange(min(hydrogen_charges), max(hydrogen_charges) + bin_size, bin_size)
+        histogram = fragment_histogram({hydrogen_key: hydrogen_charges}, bins)
+        counts = fragment_percentages(histogram, hydrogen_key)
+
         # Create the histogram
         plt.figure(figsize=(10, 6))
-        counts, bins, patches = plt.hist(hydrogen_charges, bins=np.arange(min(hydrogen_charges), max(hydrogen_charges) + bin_size, bin_size), edgecolor='black', color='tab:blue', density=True)
-
-        # Convert counts to percentage
-        counts = counts * bin_size * 100
+        patches = plt.bar(bins[:-1], counts, width=np.diff(bins), align='edge', edgecolor='black', color='tab:blue')
         
         sum = 0
         # Plot the histogram with the frequency percentages
         for count, patch in zip(counts, patches):
-            patch.set_height(count)
             sum += count
             plt.text(patch.get_x() + patch.get_width() / 2, count, f'{count:.1f}', ha='center', va='bottom', fontsize=10, fontweight='bold')
         
@@ -496,7 +402,7 @@ def main():
 
     input_file_path = 'c:\\Users\\sammy\\Research\\TDDFT-output-and-scripts\\histograms_stats_molecule_formation\\c2h6\\moleculeFormations_8.5.csv'
     print("READING IN DATA FROM FILE:",input_file_path)
-    fragments_data = process_fragments(input_file_path,line_skip_num=9)
+    fragments_data = process_fragments(input_file_path)
     
     # Set the output file directory to match the input file's directory
     output_file_directory = os.path.dirname(input_file_path)
@@ -505,16 +411,21 @@ def main():
         valence_to_charges(fragments_data)
     
     fragments_data = dict(sorted(fragments_data.items(), key=custom_sort))
+
+    intervals = None
+    if BOOTSTRAP_RESAMPLES:
+        intervals = bootstrap_fragment_stats(fragments_data, process_fragment_blocks(input_file_path), num_resamples=BOOTSTRAP_RESAMPLES)
     
     # Create plots with file names including the output directory
     plot_charge_states(fragments_data, fig_name=os.path.join(output_file_directory, "frag_charge_states.png"))
-    #plot_fragment_counts_and_averages_log(fragments_data, fig_name=os.path.join(output_file_directory, "frag_charge_averages_log.png"), log_scale=True)
+    #plot_fragment_counts_and_averages_log(fragments_data, fig_name=os.path.join(output_file_directory, "frag_charge_averages_log.png"), log_scale=True, intervals=intervals)
     plot_fragment_counts_and_averages_two_ax(fragments_data, fig_name=os.path.join(output_file_directory, "frag_charge_averages_two_axes.png"),
                                               hydrogen_charge_scale_factor=9,
                                               fragment_freq_color='#194fa6',fragment_charge_color='#b0dce4',
                                               hydrogen_freq_color='#330987',hydrogen_charge_color='#b3e897',
                                               inner_num_font_size=10,
-                                              include_seperate_charge_leg_for_h=False)
+                                              include_seperate_charge_leg_for_h=False,
+                                              intervals=intervals)
     plot_hydrogen(fragments_data, fig_name=os.path.join(output_file_directory, 'hydrogen_charge_distribution.png'))
     plot_hydrogen_boxplot(fragments_data, fig_name=os.path.join(output_file_directory, 'hydrogen_charge_boxplot.png'))
     
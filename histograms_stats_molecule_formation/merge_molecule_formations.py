@@ -0,0 +1,182 @@
+# Finds every moleculeFormations*.csv below a data directory, parses them in parallel, and merges them into one
+# fragment table tagged with the molecule, polarization and laser intensity of each simulation
+# Run from the repository root: python -m histograms_stats_molecule_formation.merge_molecule_formations
+# Author: Samuel S. Taylor
+
+import hashlib
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from histograms_stats_molecule_formation.molecule_formation_cache import load_fragment_table
+
+FILE_PATTERN = re.compile(r'^moleculeFormations.*\.csv$')
+DIGEST_CHUNK_BYTES = 1 << 20  # 1 MB per read while hashing the input files
+
+def find_molecule_formation_files(root):
+    found = []
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if FILE_PATTERN.match(name):
+                found.append(os.path.join(directory, name))
+    return sorted(found)
+
+
+def file_digest(filepath, chunk_bytes=DIGEST_CHUNK_BYTES):
+    # Hash of the file contents, read in chunks
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filepath, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_bytes), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def skip_identical_files(filepaths, root):
+    """
+    Keeps one file of every set of byte-identical files (the same results copied under another name), so their
+    simulations are not counted twice. The copy kept is the deepest in the tree, which carries the most tags, and of
+    those the one with the shortest path (c4h10/x_polarized over c4h10/karcsi_paper_histo_x_polarized).
+    """
+    copies = {}
+    for filepath in filepaths:
+        copies.setdefault(file_digest(filepath), []).append(filepath)
+
+    kept = []
+    for group in copies.values():
+        relpaths = [os.path.relpath(filepath, root) for filepath in group]
+        best = min(range(len(group)), key=lambda i: (-relpaths[i].count(os.sep), len(relpaths[i])))
+        for i, relpath in enumerate(relpaths):
+            if i != best:
+                print(f"  Skipping {relpath}: identical to {relpaths[best]}")
+        kept.append(group[best])
+    return sorted(kept)
+
+
+def _parse_number(text):
+    # "7.5", "7.50", "7_5" -> 7.5
+    return float(text.replace('_', '.'))
+
+
+def parse_file_tags(root, filepath, first_run_id=''):
+    """
+    Works out (molecule, polarization, intensity) from where a file sits in the data tree, e.g.
+      c4h10/x_polarized/moleculeFormations.csv          -> ('c4h10', 'x', <from run ids>)
+      c2h6/moleculeFormations_8.5.csv                   -> ('c2h6', '', 8.5)
+      cyclobutane_7.50/moleculeFormations.csv           -> ('cyclobutane', '', 7.5)
+      c4h10/low_temp/moleculeFormations_user.csv        -> ('c4h10', 'low_temp', nan)
+    Directories that are not an "<axis>_polarized" directory (ppp, low_temp, ...) are used as the polarization
+    label as-is. When the path has no intensity it is taken from run ids such as "pulse_7_5r54", "C4H10_7_5y_r44" or
+    "C2H2_14r176".
+    """
+    parts = os.path.relpath(filepath, root).split(os.sep)
+    directories, filename = parts[:-1], parts[-1]
+
+    molecule = ''
+    intensity = np.nan
+    polarization_parts = []
+
+    match = re.search(r'_(\d+(?:\.\d+)?)\.csv$', filename)
+    if match:
+        intensity = _parse_number(match.group(1))
+
+    for i, directory in enumerate(directories):
+        if re.fullmatch(r'\d+(?:\.\d+)?', directory):
+            intensity = _parse_number(directory)
+            continue
+        match = re.fullmatch(r'(.+?)_(\d+(?:\.\d+)?)', directory)
+        if i == 0:
+            molecule = match.group(1) if match else directory
+            if match:
+                intensity = _parse_number(match.group(2))
+            continue
+        match = re.search(r'(?:^|_)([xyz]+)_polarized$', directory)
+        polarization_parts.append(match.group(1) if match else directory)
+
+    if np.isnan(intensity):
+        match = (re.search(r'pulse_?(\d+(?:_\d+)?)r\d+$', first_run_id)
+                 or re.search(r'_(\d+(?:_\d+)?)[xyz]*_?r\d+$', first_run_id))
+        if match:
+            intensity = _parse_number(match.group(1))
+
+    return molecule, '/'.join(polarization_parts), intensity
+
+
+def concatenate_fragment_tables(tables):
+    # Stacks whole fragment tables, renumbering block_index so it stays unique across the merged table
+    merged = {}
+    block_offset = 0
+    offset_block_indexes = []
+    for table in tables:
+        offset_block_indexes.append(table['block_index'] + block_offset)
+        block_offset += len(table['run_ids'])
+
+    for key in tables[0]:
+        if key == 'block_index':
+            merged[key] = np.concatenate(offset_block_indexes)
+        else:
+            merged[key] = np.concatenate([table[key] for table in tables])
+    return merged
+
+
+def merge_molecule_formations(root, processes=None):
+    """
+    Parses every moleculeFormations*.csv below root in a process pool (each file through its own .npz cache) and
+    returns one fragment table with the per-block tag columns source_files, molecules, polarizations and
+    intensities added. Of every set of byte-identical files only one is merged, the copy deepest in the tree and
+    then the one with the shortest path (see skip_identical_files).
+    """
+    filepaths = find_molecule_formation_files(root)
+    if not filepaths:
+        raise FileNotFoundError(f"No moleculeFormations*.csv files found below {root}")
+    filepaths = skip_identical_files(filepaths, root)
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        tables = list(executor.map(load_fragment_table, filepaths))
+
+    tagged_tables = []
+    for filepath, table in zip(filepaths, tables):
+        num_blocks = len(table['run_ids'])
+        first_run_id = str(table['run_ids'][0]) if num_blocks else ''
+        molecule, polarization, intensity = parse_file_tags(root, filepath, first_run_id)
+
+        table = dict(table)
+        table['source_files'] = np.full(num_blocks, os.path.relpath(filepath, root))
+        table['molecules'] = np.full(num_blocks, molecule)
+        table['polarizations'] = np.full(num_blocks, polarization)
+        table['intensities'] = np.full(num_blocks, intensity, dtype=np.float64)
+        tagged_tables.append(table)
+
+    return concatenate_fragment_tables(tagged_tables)
+
+
+def print_summary(merged):
+    # One line per (molecule, polarization, intensity) group: number of simulations and fragments
+    groups = {}
+    fragments_per_block = np.bincount(merged['block_index'], minlength=len(merged['run_ids']))
+    intensity_labels = ['-' if np.isnan(intensity) else f'{intensity:g}' for intensity in merged['intensities']]
+    for i, key in enumerate(zip(merged['molecules'].tolist(), merged['polarizations'].tolist(), intensity_labels)):
+        num_sims, num_frags = groups.get(key, (0, 0))
+        groups[key] = (num_sims + 1, num_frags + fragments_per_block[i])
+
+    print(f"{'Molecule':<14}{'Polarization':<32}{'Intensity':>10}{'Simulations':>13}{'Fragments':>11}")
+    for (molecule, polarization, intensity), (num_sims, num_frags) in sorted(groups.items()):
+        print(f"{molecule or '-':<14}{polarization or '-':<32}{intensity:>10}{num_sims:>13}{num_frags:>11}")
+
+
+def main():
+    print("-= MERGING MOLECULE FORMATION FILES =-")
+
+    root = 'histograms_stats_molecule_formation'
+    output_file = os.path.join(root, 'merged_moleculeFormations.npz')
+
+    merged = merge_molecule_formations(root)
+    print_summary(merged)
+
+    np.savez(output_file, **merged)
+    print("Merged", len(np.unique(merged['source_files'])), "files /", len(merged['run_ids']),
+          "simulations into:", output_file)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+# Columnar .npz cache of parsed moleculeFormations.csv data so repeated plotting runs skip the text parsing
+# Author: Samuel S. Taylor
+
+import hashlib
+import json
+import os
+import numpy as np
+
+from histograms_stats_molecule_formation.molecule_formation_reader import read_blocks_with_offsets
+
+CACHE_SUFFIX = '.cache.npz'
+INDEX_SUFFIX = '.index.json'
+FINGERPRINT_CHUNK_BYTES = 1 << 20  # 1 MB per read while hashing the cached part of the file
+
+# Columns with one entry per simulation block; every other column has one entry per fragment event
+BLOCK_COLUMNS = ('run_ids', 'density_sums')
+
+# Per-fragment value columns, one entry per fragment event. Missing values (e.g. the velocity rows of the older
+# 3-line files) are stored as NaN.
+VALUE_COLUMNS = ('densities', 'times', 'x_velocities', 'y_velocities', 'z_velocities', 'speeds')
+
+
+def cache_path(filepath):
+    return filepath + CACHE_SUFFIX
+
+
+def index_path(filepath):
+    return filepath + INDEX_SUFFIX
+
+
+def build_fragment_table(filepath):
+    """
+    Parses a moleculeFormations.csv file into a flat fragment table (dict of NumPy column arrays):
+      - run_ids, density_sums: one entry per simulation block
+      - block_index: which block each fragment event belongs to
+      - position: the fragment's column within its block (atom number for the per-atom files)
+      - fragments: fragment formula with the atom indices stripped
+      - densities, times, x/y/z_velocities, speeds: the per-fragment values
+    """
+    table, _ = _parse_table(filepath)
+    return table
+
+
+def _parse_table(filepath, start_offset=0, first_block=0):
+    # Parses the blocks from start_offset on, numbering them from first_block. Also returns the byte offset of the
+    # last block read, which is where the next incremental refresh resumes.
+    run_ids = []
+    density_sums = []
+    block_index = []
+    position = []
+    fragments = []
+    values = {column: [] for column in VALUE_COLUMNS}
+    last_block_offset = start_offset
+
+    for i, (block_offset, block) in enumerate(read_blocks_with_offsets(filepath, start_offset), first_block):
+        last_block_offset = block_offset
+        num_frags = len(block.fragments)
+        run_ids.append(block.run_id)
+        density_sums.append(np.nan if block.density_sum is None else block.density_sum)
+        block_index.extend([i] * num_frags)
+        position.extend(range(num_frags))
+        fragments.extend(block.fragments)
+        for column in VALUE_COLUMNS:
+            row = getattr(block, column)[:num_frags]
+            values[column].extend(row)
+            values[column].extend([np.nan] * (num_frags - len(row)))
+
+    table = {
+        'run_ids': np.array(run_ids, dtype=str),
+        'density_sums': np.array(density_sums, dtype=np.float64),
+        'block_index': np.array(block_index, dtype=np.int64),
+        'position': np.array(position, dtype=np.int32),
+        'fragments': np.array(fragments, dtype=str),
+    }
+    for column in VALUE_COLUMNS:
+        table[column] = np.array(values[column], dtype=np.float64)
+    return table, last_block_offset
+
+
+def merge_fragment_tables(head, tail, num_head_blocks):
+    """
+    Returns the first num_head_blocks blocks of head followed by every block of tail. tail's block_index values
+    must already continue from num_head_blocks.
+    """
+    num_head_events = np.searchsorted(head['block_index'], num_head_blocks)
+    merged = {}
+    for key, column in head.items():
+        keep = num_head_blocks if key in BLOCK_COLUMNS else num_head_events
+        merged[key] = np.concatenate([column[:keep], tail[key]])
+    return merged
+
+
+def file_fingerprint(filepath, offset, chunk_bytes=FINGERPRINT_CHUNK_BYTES):
+    # Hash of every byte before offset, read in chunks. If it changed, the file was rewritten rather than appended
+    # to, and the cached blocks can not be reused. Hashing is cheap next to parsing those blocks again.
+    fingerprint = hashlib.sha1()
+    with open(filepath, 'rb') as file:
+        remaining = offset
+        while remaining > 0:
+            chunk = file.read(min(chunk_bytes, remaining))
+            if not chunk:
+                break
+            fingerprint.update(chunk)
+            remaining -= len(chunk)
+    return fingerprint.hexdigest()
+
+
+def read_index(filepath):
+    try:
+        with open(index_path(filepath), 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_cache(path, table):
+    # Write to a temporary file first so an interrupted run never leaves a truncated cache behind
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        np.savez(file, **table)
+    os.replace(temp_path, path)
+
+
+def write_index(filepath, index):
+    temp_path = index_path(filepath) + '.tmp'
+    with open(temp_path, 'w') as file:
+        json.dump(index, file)
+    os.replace(temp_path, index_path(filepath))
+
+
+def load_cached_table(filepath, num_blocks):
+    path = cache_path(filepath)
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as cached:
+        table = {key: cached[key] for key in cached.files}
+    return table if len(table['run_ids']) == num_blocks else None
+
+
+def load_fragment_table(filepath, use_cache=True):
+    """
+    Returns the fragment table for filepath (see build_fragment_table).
+
+    The parsed table is saved next to the CSV as <filepath>.cache.npz, and a small sidecar <filepath>.index.json
+    records the CSV's size and mtime plus the byte offset and block number of the last block parsed. If the CSV is
+    unchanged the arrays are loaded straight from the cache. If the file grew and everything before the last cached
+    block is byte for byte what was cached (new blocks appended, the usual case while a campaign is still running),
+    only the tail of the file, from the last cached block on, is parsed and merged into the cached table. The last
+    block is always re-read so a block that was still being written is picked up whole. Any other change is parsed
+    again in full.
+    """
+    if not use_cache:
+        return build_fragment_table(filepath)
+
+    stat = os.stat(filepath)
+    index = read_index(filepath)
+    table = load_cached_table(filepath, index['num_blocks']) if index else None
+
+    if table is not None and index['size'] == stat.st_size and index['mtime_ns'] == stat.st_mtime_ns:
+        return table
+
+    if (table is not None and stat.st_size > index['size']
+            and file_fingerprint(filepath, index['resume_offset']) == index['fingerprint']):
+        tail, last_block_offset = _parse_table(filepath, index['resume_offset'], index['resume_block'])
+        table = merge_fragment_tables(table, tail, index['resume_block'])
+        print("Parsed", len(table['run_ids']) - index['num_blocks'], "new simulation blocks from", filepath)
+    else:
+        table, last_block_offset = _parse_table(filepath)
+
+    num_blocks = len(table['run_ids'])
+    index = {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'num_blocks': num_blocks,
+        'resume_offset': last_block_offset,
+        'resume_block': max(num_blocks - 1, 0),
+        'fingerprint': file_fingerprint(filepath, last_block_offset),
+    }
+    try:
+        write_cache(cache_path(filepath), table)
+        write_index(filepath, index)
+    except OSError as error:
+        print("Could not write cache file for", filepath, "-", error)
+    return table
+
+
+def group_by_fragment(table, column, mask=None):
+    """
+    Returns {fragment: [values of column]} with the fragments in order of first appearance in the file, the same
+    dict the per-script parsing loops used to build.
+    """
+    fragments = table['fragments']
+    values = table[column]
+    if mask is not None:
+        fragments = fragments[mask]
+        values = values[mask]
+
+    names, first_index, inverse, counts = np.unique(fragments, return_index=True, return_inverse=True,
+                                                   return_counts=True)
+    grouped = np.split(values[np.argsort(inverse, kind='stable')], np.cumsum(counts)[:-1])
+    return {str(names[k]): grouped[k].tolist() for k in np.argsort(first_index)}
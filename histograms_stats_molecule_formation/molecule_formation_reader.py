@@ -0,0 +1,111 @@
+# Streaming reader for moleculeFormations.csv (and classical atom_info.csv) files shared by the analysis scripts
+# Author: Samuel S. Taylor
+
+from collections import namedtuple
+
+# One simulation (one r<seed> run) worth of data. Every field except run_id/density_sum is a list with one
+# entry per fragment, in the order the fragments appear on the header line.
+SimulationBlock = namedtuple('SimulationBlock', ['run_id', 'fragments', 'densities', 'times', 'density_sum',
+                                                 'x_velocities', 'y_velocities', 'z_velocities', 'speeds'])
+
+# Row label -> SimulationBlock field. Classical files write "Charges"/"Charge Sum" instead of the density rows.
+ROW_FIELDS = {
+    'Densities': 'densities',
+    'Charges': 'densities',
+    'Time[fs]': 'times',
+    'Density Sum': 'density_sum',
+    'Charge Sum': 'density_sum',
+    'X Velocity[A/fs]': 'x_velocities',
+    'Y Velocity[A/fs]': 'y_velocities',
+    'Z Velocity[A/fs]': 'z_velocities',
+    'Speed[A/fs]': 'speeds',
+}
+
+
+def strip_atom_indices(label):
+    # "C2H2[0][1][4][7]" -> "C2H2", "H[5]" -> "H"
+    return label.split('[')[0].strip()
+
+
+def parse_float_row(row):
+    return [float(value.strip()) for value in row[1:] if value.strip()]
+
+
+def _new_block(run_id, fragments):
+    return {'run_id': run_id, 'fragments': fragments, 'densities': [], 'times': [], 'density_sum': None,
+            'x_velocities': [], 'y_velocities': [], 'z_velocities': [], 'speeds': []}
+
+
+def read_blocks(filepath, start_offset=0):
+    """
+    Lazily yields one SimulationBlock per simulation in a moleculeFormations.csv file.
+
+    Blocks are split on their row labels instead of a fixed line stride, so both the full 9-line format and the
+    older 3-line (fragments, densities, time) format are read. Only the block currently being parsed is held in
+    memory, so memory use does not grow with the size of the file.
+    """
+    for _, block in read_blocks_with_offsets(filepath, start_offset):
+        yield block
+
+
+def read_blocks_with_offsets(filepath, start_offset=0):
+    """
+    Same as read_blocks, but yields (offset, block) pairs where offset is the byte offset of the block's header
+    line. start_offset must be the offset of a header line (e.g. one returned by an earlier call); reading then
+    resumes from there, which lets callers parse only the blocks appended since their last read.
+    """
+    with open(filepath, 'rb') as file:
+        file.seek(start_offset)
+        offset = start_offset
+        block = None
+        block_offset = start_offset
+        for raw_line in file:
+            line_offset = offset
+            offset += len(raw_line)
+
+            row = raw_line.decode().split(',')
+            label = row[0].strip()
+            if not label:
+                continue
+
+            field = ROW_FIELDS.get(label)
+            if field is None:
+                # Any unrecognised label is the run id of the next block
+                if block is not None:
+                    yield block_offset, SimulationBlock(**block)
+                block = _new_block(label, [strip_atom_indices(frag) for frag in row[1:] if frag.strip()])
+                block_offset = line_offset
+                continue
+
+            if block is None:
+                raise ValueError(f"{filepath}, byte {line_offset}: '{label}' row found before any run header.")
+
+            values = parse_float_row(row)
+            if field == 'density_sum':
+                block[field] = values[0] if values else None
+            else:
+                block[field] = values
+
+        if block is not None:
+            yield block_offset, SimulationBlock(**block)
+
+
+def read_raw_blocks(filepath):
+    """
+    Lazily yields (run_id, lines) for every simulation block, where lines are the block's unparsed text lines
+    (line endings included, so writing them back out reproduces the file). Any lines before the first header are
+    yielded with a run_id of None.
+    """
+    with open(filepath, 'r', newline='') as file:
+        run_id = None
+        lines = []
+        for line in file:
+            label = line.split(',', 1)[0].strip()
+            if label and label not in ROW_FIELDS:
+                if lines:
+                    yield run_id, lines
+                run_id = label
+                lines = []
+            lines.append(line)
+        if lines:
+            yield run_id, lines
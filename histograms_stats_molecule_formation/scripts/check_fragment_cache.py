@@ -0,0 +1,74 @@
+# Regression check of the moleculeFormations.csv cache: after a file is rewritten in place (same size or grown) or
+# appended to, load_fragment_table must return what a fresh parse of the file gives
+# Run from the repository root: python -m histograms_stats_molecule_formation.scripts.check_fragment_cache
+# Author: Samuel S. Taylor
+
+import os
+import tempfile
+import numpy as np
+
+from benchmarks.synthetic_molecule_formations import generate_molecule_formations
+from histograms_stats_molecule_formation.molecule_formation_cache import load_fragment_table, build_fragment_table
+
+NUM_BLOCKS = 2000
+
+
+def check(name, passed):
+    print(f"  {'ok    ' if passed else 'FAILED'} {name}")
+    return passed
+
+
+def tables_equal(first, second):
+    return first.keys() == second.keys() and all(
+        np.array_equal(first[key], second[key], equal_nan=first[key].dtype.kind == 'f') for key in first)
+
+
+def rewrite_middle_digit(filepath):
+    # Changes one digit of a value half way through the file, keeping the file size, and moves the mtime on so the
+    # change can not hide behind an unchanged mtime
+    with open(filepath, 'rb') as file:
+        data = bytearray(file.read())
+    position = data.index(b'Densities, ', len(data) // 2) + len(b'Densities, ')
+    data[position] = ord('9') if data[position] != ord('9') else ord('1')
+    stat = os.stat(filepath)
+    with open(filepath, 'wb') as file:
+        file.write(data)
+    os.utime(filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def append_blocks(source, filepath):
+    # Appends the first blocks of source to filepath
+    with open(source, 'r') as file:
+        blocks = file.read().split('\n\n')[:5]
+    with open(filepath, 'a') as file:
+        file.write('\n\n'.join(blocks) + '\n\n')
+
+
+def check_cache(filepath, name):
+    return check(name, tables_equal(load_fragment_table(filepath), build_fragment_table(filepath)))
+
+
+def main():
+    print("-= FRAGMENT CACHE CHECK =-")
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = os.path.join(directory, 'moleculeFormations.csv')
+        extra = os.path.join(directory, 'extra.csv')
+        generate_molecule_formations(filepath, NUM_BLOCKS, seed=1)
+        generate_molecule_formations(extra, 5, seed=2)
+
+        passed = check_cache(filepath, "first load")
+        rewrite_middle_digit(filepath)
+        passed = check_cache(filepath, "mid-file rewrite with the same size") and passed
+        append_blocks(extra, filepath)
+        passed = check_cache(filepath, "appended blocks") and passed
+        rewrite_middle_digit(filepath)
+        append_blocks(extra, filepath)
+        passed = check_cache(filepath, "mid-file rewrite with blocks appended") and passed
+
+    if not passed:
+        raise ValueError("load_fragment_table returned stale cached data")
+    print("All checks passed")
+
+
+if __name__ == '__main__':
+    main()
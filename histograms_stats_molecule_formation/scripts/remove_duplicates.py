@@ -1,38 +1,87 @@
-#NOT PROPERLY WORKING
-import csv
-
-# Read the file and process lines
-def remove_duplicates(input_file, output_file):
-    seen = set()
-    unique_lines = []
-    line_num=0
-
-    with open(input_file, 'r') as file:
-        reader = csv.reader(file)
-        for line in reader:
-            line_num+=1
-            # Convert the line list to a tuple so it can be added to a set
-            line_tuple = tuple(line)
-            # Check if the line starts with 'd' and is a duplicate
-            if line_tuple[0].lower().startswith('d'):
-                if line_tuple not in seen:
-                    seen.add(line_tuple)
-                    unique_lines.append(line)
-                else:
-                    print("Duplicate found at line:",line_num)
+# Run from the repository root: python -m histograms_stats_molecule_formation.scripts.remove_duplicates
+import hashlib
+import os
+
+from histograms_stats_molecule_formation.molecule_formation_reader import read_raw_blocks
+
+
+def block_digest(run_id, lines):
+    # Hash the run id and the block's values with surrounding whitespace stripped and empty lines skipped, so blocks
+    # that only differ in spacing, line endings or the blank separator line (missing after the last block of a file)
+    # still count as the same simulation
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(run_id.encode())
+    for line in lines[1:]:
+        values = ','.join(field for field in (field.strip() for field in line.split(',')) if field)
+        if not values:
+            continue
+        digest.update(values.encode())
+        digest.update(b'\n')
+    return digest.digest()
+
+
+def remove_duplicates(input_file, output_file=None):
+    """
+    Drops repeated simulation blocks (same run id and same values) from a moleculeFormations.csv file in a single
+    pass, keeping the first copy of each. The file is streamed one block at a time; what stays in memory is a 16 byte
+    hash per distinct block plus every distinct run id with the simulation it was first seen as.
+
+    Run ids that appear more than once with different values are reported but kept, since those are separate
+    simulations that reused a seed. If output_file is None the file is only checked and nothing is written;
+    otherwise the output is written to a temporary file and moved into place, so output_file may be input_file.
+    """
+    seen_blocks = set()
+    seen_run_ids = {}
+    num_blocks = 0
+    num_duplicates = 0
+
+    output = None
+    if output_file is not None:
+        temp_file = output_file + '.tmp'
+        output = open(temp_file, 'w', newline='')
+
+    try:
+        for run_id, lines in read_raw_blocks(input_file):
+            if run_id is None:
+                if output is not None:
+                    output.writelines(lines)
+                continue
+
+            num_blocks += 1
+            digest = block_digest(run_id, lines)
+            if digest in seen_blocks:
+                num_duplicates += 1
+                print(f"Duplicate block found: {run_id} (simulation {num_blocks}, "
+                      f"first seen as simulation {seen_run_ids[run_id]})")
+                continue
+
+            if run_id in seen_run_ids:
+                print(f"WARNING: run id {run_id} repeated with different data (simulation {num_blocks}, "
+                      f"first seen as simulation {seen_run_ids[run_id]}). Keeping both.")
             else:
-                unique_lines.append(line)
-    
-    # Write the unique lines to the output file
-    with open(output_file, 'w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerows(unique_lines)
-        
-    if (line_num==len(unique_lines)):
-        print('No duplicate lines found.')
-
-
-# Usage
-input_file = 'histograms_stats_molecule_formation\scripts\moleculeFormations.csv'
-output_file = 'histograms_stats_molecule_formation\scripts\moleculeFormationsND.csv'
-remove_duplicates(input_file, output_file)
+                seen_run_ids[run_id] = num_blocks
+            seen_blocks.add(digest)
+
+            if output is not None:
+                output.writelines(lines)
+    except BaseException:
+        if output is not None:
+            output.close()
+            os.remove(temp_file)
+        raise
+
+    if output is not None:
+        output.close()
+        os.replace(temp_file, output_file)
+
+    if num_duplicates == 0:
+        print("No duplicate blocks found.")
+    else:
+        print(f"Found {num_duplicates} duplicate blocks out of {num_blocks} simulations.")
+    return num_duplicates
+
+
+if __name__ == '__main__':
+    input_file = 'histograms_stats_molecule_formation\\scripts\\moleculeFormations.csv'
+    output_file = 'histograms_stats_molecule_formation\\scripts\\moleculeFormationsND.csv'
+    remove_duplicates(input_file, output_file)
@@ -1,6 +1,10 @@
+# Run from the repository root: python -m k_energy_v_time.k_energy_graph
 import numpy as np
 import matplotlib.pyplot as plt
 
+from trajectory_xyz.trajectory_cache import load_trajectory
+from trajectory_xyz.kinematics import compute_kinematics
+
 class KineticEnergyGraph:
     def __init__(self, elem="H", color="red", snapshot_dot_color='tab:green'):
         print("-=GENERATING KE-GRAPH=-")
@@ -15,50 +19,30 @@ class KineticEnergyGraph:
         self.mass = element_num_nucleons[elem] * mass_convfactor
         print('  Element', elem, 'mass (eV_fs^2/A^2):', self.mass)
     
-    def read_trajectory(self, file_name=""):
-        with open(file_name, 'r') as file:
-            lines = file.readlines()
-        
-        data = []
-        time_steps = []
-        num_atoms = int(lines[0].strip())
-        for i in range(0, len(lines), num_atoms + 2):
-            time_line = lines[i + 1].strip()
-            time = float(time_line.split('=')[-1])
-            time_steps.append(time)
-            
-            atom_data = lines[i + 2:i + 2 + num_atoms]
-            atom_positions = []
-            atom = atom_data[-2]  # Extract second-to-last atom
-            parts = atom.split()
-            x, y, z = map(float, parts[1:])
-            atom_positions.append((x, y, z))
-            data.append(atom_positions)
-        
-        self.time_steps = np.array(time_steps)
-        self.positions = np.array(data)
+    def read_trajectory(self, file_name="", step=1, atom=-2):
+        # Positions of one atom (default the second-to-last), every step-th frame, sliced from the memory-mapped cache
+        trajectory = load_trajectory(file_name)
+        times = trajectory.times[::step]
+        positions = np.asarray(trajectory.positions[::step, [atom]])
+
+        self.time_steps = times
+        self.positions = positions
     
     def calculate_velocity(self):
-        speeds = []
-        for i in range(1, len(self.time_steps)):
-            dt = self.time_steps[i] - self.time_steps[i-1]
-            dx = self.positions[i][0][0] - self.positions[i-1][0][0]
-            dy = self.positions[i][0][1] - self.positions[i-1][0][1]
-            dz = self.positions[i][0][2] - self.positions[i-1][0][2]
-            speed = np.sqrt(dx**2 + dy**2 + dz**2) / dt
-            speeds.append(speed)
-        print("  Initial speed (A/fs):", speeds[0])
-        print("  Final speed (A/fs):", speeds[-1])
-        self.speeds = np.array(speeds)
-        self.kinetic_energies = 1/2 * self.mass * (self.speeds)**2
+        # Central differences over all frames (non-uniform timesteps allowed), see trajectory_xyz.kinematics
+        kinematics = compute_kinematics(self.positions, self.time_steps, [self.mass])
+        self.speeds = kinematics.speeds[:, 0]
+        self.kinetic_energies = kinematics.kinetic_energies[:, 0]
+        print("  Initial speed (A/fs):", self.speeds[0])
+        print("  Final speed (A/fs):", self.speeds[-1])
     
     def plot_velocity(self, output_file, snapshot_times):
         plt.figure(figsize=(10.2, 8))  # Set figure size
-        plt.plot(self.time_steps[1:], self.speeds, linestyle='-', color=self.color, linewidth=2, label='Speed (A/fs)')  # Line graph
+        plt.plot(self.time_steps, self.speeds, linestyle='-', color=self.color, linewidth=2, label='Speed (A/fs)')  # Line graph
         
         # Plot green points at snapshot_times
-        snapshot_indices = [i for i, t in enumerate(self.time_steps[1:]) if any(np.isclose(t, st) for st in snapshot_times)]
-        plt.scatter(np.array(self.time_steps[1:])[snapshot_indices], self.speeds[snapshot_indices], color=self.snapshot_dot_color, zorder=5, s=200, edgecolor='black')
+        snapshot_indices = [i for i, t in enumerate(self.time_steps) if any(np.isclose(t, st) for st in snapshot_times)]
+        plt.scatter(np.array(self.time_steps)[snapshot_indices], self.speeds[snapshot_indices], color=self.snapshot_dot_color, zorder=5, s=200, edgecolor='black')
         
         plt.xlabel('Time (fs)', fontsize=30, fontweight='bold', fontname='Times New Roman')
         plt.ylabel('Velocity (Å/fs)', fontsize=30, fontweight='bold', fontname='Times New Roman', color=self.color)
@@ -76,11 +60,11 @@ class KineticEnergyGraph:
         
     def plot_kinetic_energy(self, output_file, snapshot_times):
         plt.figure(figsize=(10.2, 8))  # Set figure size
-        plt.plot(self.time_steps[1:], self.kinetic_energies, linestyle='-', color=self.color, linewidth=2, label='Kinetic Energy (eV)')  # Line graph
+        plt.plot(self.time_steps, self.kinetic_energies, linestyle='-', color=self.color, linewidth=2, label='Kinetic Energy (eV)')  # Line graph
         
         # Plot green points at snapshot_times
-        snapshot_indices = [i for i, t in enumerate(self.time_steps[1:]) if any(np.isclose(t, st) for st in snapshot_times)]
-        plt.scatter(np.array(self.time_steps[1:])[snapshot_indices], self.kinetic_energies[snapshot_indices], color=self.snapshot_dot_color, zorder=5, s=200, edgecolor='black')
+        snapshot_indices = [i for i, t in enumerate(self.time_steps) if any(np.isclose(t, st) for st in snapshot_times)]
+        plt.scatter(np.array(self.time_steps)[snapshot_indices], self.kinetic_energies[snapshot_indices], color=self.snapshot_dot_color, zorder=5, s=200, edgecolor='black')
         
         plt.xlabel('Time (fs)', fontsize=30, fontweight='bold', fontname='Times New Roman')
         plt.ylabel('Kinetic Energy (eV)', fontsize=30, fontweight='bold', fontname='Times New Roman', color=self.color)
@@ -1,6 +1,12 @@
+# Run from the repository root: python -m k_energy_v_time.k_energy_multiple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 import numpy as np
 import matplotlib.pyplot as plt
 
+from trajectory_xyz.trajectory_cache import load_trajectory
+from trajectory_xyz.kinematics import compute_kinematics
+
 # Function to convert numbers to subscripted versions
 def subscript_numbers(molecule):
     subscript_map = str.maketrans("0123456789", "₀₁₂₃₄₅₆₇₈₉")
@@ -20,43 +26,24 @@ class KineticEnergyGraph:
         self.mass = element_num_nucleons[elem] * mass_convfactor
         print('  Element', elem, 'mass (eV_fs^2/A^2):', self.mass)
     
-    def read_trajectory(self, file_name=""):
-        with open(file_name, 'r') as file:
-            lines = file.readlines()
-        
-        data = []
-        time_steps = []
-        num_atoms = int(lines[0].strip())
-        for i in range(0, len(lines), num_atoms + 2):
-            time_line = lines[i + 1].strip()
-            time = float(time_line.split('=')[1].split()[0]) / 1000  # div. by 1000 to convert iteration num to time
-            time_steps.append(time)
-            
-            atom_data = lines[i + 2:i + 2 + num_atoms]
-            atom_positions = []
-            atom = atom_data[-2]  # Extract second-to-last atom
-            parts = atom.split()
-            x, y, z = map(float, parts[1:])
-            atom_positions.append((x, y, z))
-            data.append(atom_positions)
-        
-        self.time_steps = np.array(time_steps)
-        self.positions = np.array(data)
+    def read_trajectory(self, file_name="", step=1, atom=-2):
+        # Positions of one atom (default the second-to-last), every step-th frame, sliced from the memory-mapped cache.
+        # The time axis comes from the iterations, so frames whose time[fs] field overflowed (NaN times) plot as well
+        trajectory = load_trajectory(file_name)
+        iterations = trajectory.iterations[::step]
+        positions = np.asarray(trajectory.positions[::step, [atom]])
+
+        self.time_steps = iterations / 1000  # div. by 1000 to convert iteration num to time
+        self.positions = positions
     
     def calculate_velocity(self):
-        speeds = []
-        for i in range(1, len(self.time_steps)):
-            dt = self.time_steps[i] - self.time_steps[i-1]
-            dx = self.positions[i][0][0] - self.positions[i-1][0][0]
-            dy = self.positions[i][0][1] - self.positions[i-1][0][1]
-            dz = self.positions[i][0][2] - self.positions[i-1][0][2]
-            speed = np.sqrt(dx**2 + dy**2 + dz**2) / dt
-            speeds.append(speed)
-        self.speeds = np.array(speeds)
-        self.kinetic_energies = 1/2 * self.mass * (self.speeds)**2
+        # Central differences over all frames (non-uniform timesteps allowed), see trajectory_xyz.kinematics
+        kinematics = compute_kinematics(self.positions, self.time_steps, [self.mass])
+        self.speeds = kinematics.speeds[:, 0]
+        self.kinetic_energies = kinematics.kinetic_energies[:, 0]
     
     def plot_linegraph(self, ax, col):
-        ax.plot(self.time_steps[1:], self.kinetic_energies, color=self.color, linewidth=2)
+        ax.plot(self.time_steps, self.kinetic_energies, color=self.color, linewidth=2)
         
         # Set y-axis limits from 0.25 to 2.6 for each plot
         ax.set_ylim(0.0, 2.25)
@@ -93,6 +80,27 @@ class KineticEnergyGraph:
         print("col=", col)
 
 
+def kinetic_energy_series(file_name, elem="H", step=1, atom=-2):
+    # Reads one trajectory and returns only its (time_steps, kinetic_energies), so a worker process sends back two
+    # small arrays instead of the trajectory
+    ke_graph = KineticEnergyGraph(elem=elem)
+    ke_graph.read_trajectory(file_name, step=step, atom=atom)
+    ke_graph.calculate_velocity()
+    return ke_graph.time_steps, ke_graph.kinetic_energies
+
+
+def kinetic_energy_grid(file_names, elem="H", step=1, atom=-2, processes=None):
+    """
+    kinetic_energy_series of every trajectory of an excitation grid, parsed and reduced in a process pool (one
+    trajectory per task), in the order of file_names. processes=1 runs them one after the other in this process.
+    """
+    arguments = (file_names, repeat(elem), repeat(step), repeat(atom))
+    if processes == 1:
+        return list(map(kinetic_energy_series, *arguments))
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(kinetic_energy_series, *arguments))
+
+
 def main():
     ke_graph = KineticEnergyGraph(elem="H", color='red', snapshot_dot_color='tab:green')
     input_file_base_path = 'k_energy_v_time/trajectory_files/excitation-angle30-2-'
@@ -103,6 +111,7 @@ def main():
     x_end = 3
     y_start = 1
     y_end = 8
+    processes = None  # worker processes for reading the trajectories (None uses every core)
     
     x_vals = range(x_start, x_end + 1)
     y_vals = range(y_start, y_end + 1)
@@ -115,20 +124,21 @@ def main():
     # Flatten 2D axes array into 1D for easy iteration
     axes = axes.flatten()
 
-    for i, x in enumerate(x_vals):
-        for j, y in enumerate(y_vals):
-            file_name = input_file_base_path + "x" + str(x) + "y" + str(y) + "/trajectory.xyz"
-            print("Processing file:", file_name)
-            
-            # Read the trajectory, calculate velocity, and plot the kinetic energy line graph
-            ke_graph.read_trajectory(file_name)
-            ke_graph.calculate_velocity()
-            ax = axes[i * cols + j]  # Select the appropriate subplot
-            ke_graph.plot_linegraph(ax, j + 1)  # Pass the column index to plot_linegraph
-            
-            # Set title with subscript for x and y using subscript_numbers
-            title = subscript_numbers(f'x{x}y{y}')
-            ax.set_title(title, fontsize=32, fontweight='bold', fontname='Times New Roman')
+    # Read every trajectory of the grid in parallel, only the kinetic energy series come back
+    cells = [(i, j, x, y) for i, x in enumerate(x_vals) for j, y in enumerate(y_vals)]
+    file_names = [input_file_base_path + "x" + str(x) + "y" + str(y) + "/trajectory.xyz" for _, _, x, y in cells]
+    print("Processing", len(file_names), "files with", processes or "all", "processes")
+    series = kinetic_energy_grid(file_names, elem="H", processes=processes)
+
+    for (i, j, x, y), (time_steps, kinetic_energies) in zip(cells, series):
+        ke_graph.time_steps = time_steps
+        ke_graph.kinetic_energies = kinetic_energies
+        ax = axes[i * cols + j]  # Select the appropriate subplot
+        ke_graph.plot_linegraph(ax, j + 1)  # Pass the column index to plot_linegraph
+
+        # Set title with subscript for x and y using subscript_numbers
+        title = subscript_numbers(f'x{x}y{y}')
+        ax.set_title(title, fontsize=32, fontweight='bold', fontname='Times New Roman')
 
     # Adjust spacing between subplots
     fig.subplots_adjust(wspace=0.1, hspace=0.2)  # Smaller wspace reduces horizontal space
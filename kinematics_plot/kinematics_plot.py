@@ -1,3 +1,4 @@
+# Run from the repository root: python -m kinematics_plot.kinematics_plot
 import matplotlib.pyplot as plt
 import numpy as np
 import matplotlib as mpl
@@ -5,6 +6,10 @@ from matplotlib.ticker import FuncFormatter
 import os
 import matplotlib
 
+from trajectory_xyz.trajectory_cache import load_trajectory
+from trajectory_xyz.kinematics import compute_kinematics
+from trajectory_xyz.distances import distance_series, bond_length_traces
+
 # Set global font to Times New Roman
 mpl.rcParams['font.family'] = 'Times New Roman'
 mpl.rcParams['font.weight'] = 'bold'
@@ -23,42 +28,29 @@ C_mass = 1243.7123176930008
 H_mass = 103.64269314108340
 
 SHOW_LEGENDS = True
+SMOOTH_WINDOW = None  # odd number of frames for Savitzky-Golay smoothing of the positions, None for no smoothing
 
-def read_trajectory(file, num_atoms):
-    with open(file, 'r') as f:
-        lines = f.readlines()
-
-    if lines[0].strip() != str(num_atoms):
-        raise ValueError(f'Number of atoms in the file ({lines[0].split()[0]}) does not match the expected number '
-                         f'of atoms ({num_atoms})')
-    iterations = []
-    positions = [[] for _ in range(num_atoms)]  # Create an empty list for each atom
-    distances = []
-
-    for i in range(0, len(lines), num_atoms + 2):  # +2 for iteration and blank line
-        iterations.append(int(lines[i + 1].split('=')[1].split()[0]))
-        atom_positions = []
-        for j in range(num_atoms):
-            atom_pos = np.array(list(map(float, lines[i + 2 + j].split()[1:])))
-            positions[j].append(atom_pos)
-            atom_positions.append(atom_pos)
-
-        # Calculate the distance between first two atoms (or any other pair)
-        distance = np.linalg.norm(atom_positions[0] - atom_positions[1])
-        distances.append(distance)
-
-    return iterations, positions, distances
+def read_trajectory(file, num_atoms, step=1):
+    # step > 1 samples every step-th frame of the memory-mapped binary cache (made on the first call)
+    trajectory = load_trajectory(file)
+    if trajectory.positions.shape[1] != num_atoms:
+        raise ValueError(f'Number of atoms in the file ({trajectory.positions.shape[1]}) does not match the expected '
+                         f'number of atoms ({num_atoms})')
+    iterations = trajectory.iterations[::step]
+    frames = np.asarray(trajectory.positions[::step])
+    positions = [frames[:, j] for j in range(num_atoms)]  # (frames x 3) positions of each atom
 
+    # Calculate the distance between first two atoms (or any other pair, distance_series takes a list of pairs)
+    distances = distance_series(frames, pairs=[(0, 1)])[:, 0]
 
-def calculate_velocity(positions, time):
-    velocities = [np.diff(atom_positions, axis=0) / np.diff(time)[:, None] for atom_positions in positions]
-    speeds = [np.linalg.norm(vel, axis=1) for vel in velocities]
-    return speeds
+    return iterations.tolist(), positions, distances
 
 
-def calculate_acceleration(speeds, time):
-    accelerations = [np.diff(atom_speeds) / np.diff(time[1:]) for atom_speeds in speeds]
-    return accelerations
+def calculate_kinematics(positions, time, masses, smooth_window=SMOOTH_WINDOW):
+    # All atoms at once: (frames x atoms x 3) positions -> speeds and acceleration magnitudes (frames x atoms)
+    kinematics = compute_kinematics(np.stack(positions, axis=1), time, masses, smooth_window=smooth_window)
+    accelerations = np.linalg.norm(kinematics.accelerations, axis=2)
+    return kinematics.speeds, accelerations
 
 
 def plot_distance(time, distances, directory, mode='', show=False):
@@ -97,8 +89,8 @@ def plot_positions(time, positions, directory, labels, mode='', show=False):
 
 
 def plot_velocity(time, speeds, directory, labels, mode='', show=False):
-    for i, speed in enumerate(speeds):
-        plt.plot(time[1:], speed, label=f'{labels[i]}')
+    for i, speed in enumerate(speeds.T):
+        plt.plot(time, speed, label=f'{labels[i]}')
     if mode.lower().startswith('s'):
         plt.axvline(x=25, color='#ee87ee', linestyle='--')  # Add vertical dashed line at time=25
     plt.xlabel('Time (fs)')
@@ -116,8 +108,8 @@ def plot_velocity(time, speeds, directory, labels, mode='', show=False):
 
 
 def plot_acceleration(time, accelerations, directory, labels, mode='', show=False):
-    for i, accel in enumerate(accelerations):
-        plt.plot(time[2:], accel, label=f'{labels[i]}')
+    for i, accel in enumerate(accelerations.T):
+        plt.plot(time, accel, label=f'{labels[i]}')
     
     if mode.lower().startswith('s'):
         plt.axvline(x=25, color='#ee87ee', linestyle='--')  # Add vertical dashed line at time=25
@@ -134,9 +126,9 @@ def plot_acceleration(time, accelerations, directory, labels, mode='', show=Fals
 
 
 def plot_force(time, accelerations, masses, directory, labels, mode='', show=False):
-    for i, accel in enumerate(accelerations):
+    for i, accel in enumerate(accelerations.T):
         force = masses[i] * accel
-        plt.plot(time[2:], force, label=f'{labels[i]}')
+        plt.plot(time, force, label=f'{labels[i]}')
     if mode.lower().startswith('s'):
         plt.axvline(x=25, color='#ee87ee', linestyle='--')  # Add vertical dashed line at time=25
     plt.xlabel('Time (fs)')
@@ -151,6 +143,25 @@ def plot_force(time, accelerations, masses, directory, labels, mode='', show=Fal
     plt.close()
 
 
+def plot_bond_lengths(time, positions, labels, element_a, element_b, directory, mode='', show=False):
+    # Every element_a - element_b distance over time, from the all-pairs distance array
+    distances = distance_series(np.stack(positions, axis=1))
+    for (a, b), trace in bond_length_traces(distances, labels, element_a, element_b).items():
+        plt.plot(time, trace, label=f'{labels[a]}[{a}]-{labels[b]}[{b}]')
+    if mode.lower().startswith('s'):
+        plt.axvline(x=25, color='#ee87ee', linestyle='--')  # Add vertical dashed line at time=25
+    plt.xlabel('Time (fs)')
+    plt.ylabel(f'{element_a}-{element_b} Distance (Å)')
+    plt.grid(True)
+    if SHOW_LEGENDS:
+        plt.legend(prop={'family': 'Times New Roman'})
+    plt.tight_layout()
+    plt.savefig(os.path.join(directory, f'bond_length_{element_a}{element_b}.png'))
+    if show:
+        plt.show()
+    plt.close()
+
+
 # Example usage
 
 trajectory_file_list = [
@@ -169,6 +180,7 @@ num_hydrogen_atoms = 2
 total_atoms = num_carbon_atoms + num_hydrogen_atoms + num_oxygen_atoms + num_nitrogen_atoms
 
 show = False
+bond_length_pairs = [('C', 'C'), ('C', 'H')]  # element pairs to plot the distances of
 
 for i in range(len(trajectory_file_list)):
     trajectory_file = trajectory_file_list[i]
@@ -179,13 +191,14 @@ for i in range(len(trajectory_file_list)):
     iterations, positions, distances = read_trajectory(trajectory_file, total_atoms)
     directory = os.path.dirname(trajectory_file)
     time = np.array(iterations) / 1000  # convert iterations to time in fs
-    speeds = calculate_velocity(positions, time)
-    accelerations = calculate_acceleration(speeds, time)
+    speeds, accelerations = calculate_kinematics(positions, time, masses)
 
     plot_distance(time, distances, directory, mode=mode, show=show)
     plot_positions(time, positions, directory, labels, mode=mode, show=show)
     plot_velocity(time, speeds, directory, labels, mode=mode, show=show)
     plot_acceleration(time, accelerations, directory, labels, mode=mode, show=show)
     plot_force(time, accelerations, masses, directory, labels, mode=mode, show=show)
+    for element_a, element_b in bond_length_pairs:
+        plot_bond_lengths(time, positions, labels, element_a, element_b, directory, mode=mode, show=show)
 
 print("Finished. All graphs generated.")
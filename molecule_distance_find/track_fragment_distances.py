@@ -0,0 +1,28 @@
+# Fragment centres of mass and the distances between them over a whole trajectory, from one pass over the frames
+# (instead of pasting the positions of one frame by hand), plus the times bonds break and form
+# Run from the repository root: python -m molecule_distance_find.track_fragment_distances
+# Author: Samuel S. Taylor
+
+from trajectory_xyz.fragment_tracker import track_fragments, write_event_log
+
+
+def main():
+    trajectory_file = 'kinematics_plot/trajectory_r1.xyz'
+    output_prefix = 'molecule_distance_find/trajectory_r1'
+    step = 1  # use every step-th frame
+    snapshot_every = 10  # fragment positions every n-th frame, in addition to every frame where the fragments change
+
+    events, snapshots = track_fragments(trajectory_file, step=step, snapshot_every=snapshot_every)
+    write_event_log(output_prefix, events, snapshots)
+
+    for event in events:
+        if event.changed:
+            action = 'broke' if event.kind == 'break' else 'formed'
+            print(f"  {event.time:8.2f} fs: bond {event.atoms} {action} -> {event.fragment_a}, {event.fragment_b}")
+    final = snapshots[-1]
+    print("Final fragments:", ", ".join(fragment.formula for fragment in final.fragments))
+    print("Event log written to", output_prefix + "_*.csv")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# Covariance and coincidence maps between two fragment channels, with every simulation block treated as one
+# Coulomb explosion event (one laser shot)
+# Author: Samuel S. Taylor
+
+from collections import namedtuple
+import numpy as np
+
+# Simulation blocks per chunk. Each chunk builds two dense (blocks x bins) histograms, so this bounds the memory
+CHUNK_BLOCKS = 4096
+
+# coincidence[i, j] = <a_i b_j> and covariance[i, j] = <a_i b_j> - <a_i><b_j>, where a_i / b_j are the number of
+# channel a / b events of one block that fell into bin i of bins_a / bin j of bins_b and <> averages over the blocks.
+# mean_a, mean_b are <a_i>, <b_j>
+CovarianceMap = namedtuple('CovarianceMap', ['covariance', 'coincidence', 'mean_a', 'mean_b', 'bins_a', 'bins_b',
+                                             'num_blocks'])
+
+
+def _sort_by_block(blocks, values):
+    order = np.argsort(blocks, kind='stable')
+    return np.asarray(blocks)[order], np.asarray(values, dtype=np.float64)[order]
+
+
+def _bin_index(values, bins):
+    # Same edges as np.histogram (last bin closed), -1 for values outside the edges
+    index = np.searchsorted(bins, values, side='right') - 1
+    index[values == bins[-1]] = len(bins) - 2
+    index[(index < 0) | (index >= len(bins) - 1)] = -1
+    return index
+
+
+def _chunk_histograms(sorted_blocks, bin_index, first_block, num_blocks, num_bins):
+    # Dense (num_blocks x num_bins) per block histogram of the events of blocks first_block..first_block+num_blocks-1
+    start, end = np.searchsorted(sorted_blocks, [first_block, first_block + num_blocks])
+    rows = sorted_blocks[start:end] - first_block
+    columns = bin_index[start:end]
+    inside = columns >= 0
+    flat_index = rows[inside] * num_bins + columns[inside]
+    return np.bincount(flat_index, minlength=num_blocks * num_bins).reshape(num_blocks, num_bins).astype(np.float64)
+
+
+def covariance_map(blocks_a, values_a, blocks_b, values_b, num_blocks, bins_a, bins_b, chunk_blocks=CHUNK_BLOCKS):
+    """
+    Covariance map between two channels given, for every event of each channel, the simulation block it came from
+    (0..num_blocks-1) and its value (e.g. the momentum along the polarization axis). The sum of outer products of the
+    per block histograms is accumulated chunk by chunk as one matrix product per chunk, so the memory is set by
+    chunk_blocks and the number of bins, not by the number of events.
+    """
+    bins_a = np.asarray(bins_a, dtype=np.float64)
+    bins_b = np.asarray(bins_b, dtype=np.float64)
+    if num_blocks < 1:
+        raise ValueError("A covariance map needs at least one simulation block")
+
+    sorted_blocks_a, sorted_values_a = _sort_by_block(blocks_a, values_a)
+    sorted_blocks_b, sorted_values_b = _sort_by_block(blocks_b, values_b)
+    bin_index_a = _bin_index(sorted_values_a, bins_a)
+    bin_index_b = _bin_index(sorted_values_b, bins_b)
+
+    num_bins_a, num_bins_b = len(bins_a) - 1, len(bins_b) - 1
+    sum_outer = np.zeros((num_bins_a, num_bins_b))
+    sum_a = np.zeros(num_bins_a)
+    sum_b = np.zeros(num_bins_b)
+    for first_block in range(0, num_blocks, chunk_blocks):
+        chunk_size = min(chunk_blocks, num_blocks - first_block)
+        histograms_a = _chunk_histograms(sorted_blocks_a, bin_index_a, first_block, chunk_size, num_bins_a)
+        histograms_b = _chunk_histograms(sorted_blocks_b, bin_index_b, first_block, chunk_size, num_bins_b)
+        sum_outer += histograms_a.T @ histograms_b
+        sum_a += histograms_a.sum(axis=0)
+        sum_b += histograms_b.sum(axis=0)
+
+    mean_a = sum_a / num_blocks
+    mean_b = sum_b / num_blocks
+    coincidence = sum_outer / num_blocks
+    covariance = coincidence - np.outer(mean_a, mean_b)
+    return CovarianceMap(covariance, coincidence, mean_a, mean_b, bins_a, bins_b, num_blocks)
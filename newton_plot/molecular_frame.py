@@ -0,0 +1,67 @@
+# Batched per-event rotations into the molecular frame, where a reference fragment's momentum lies along +x
+# Author: Samuel S. Taylor
+
+import numpy as np
+
+EPSILON = 1e-12
+
+
+def rotations_to_x(directions):
+    """
+    (N x 3) vectors -> (N x 3 x 3) rotation matrices that turn each vector onto +x, all built at once with
+    Rodrigues' formula (the smallest rotation, about direction x e_x). Vectors pointing along -x are turned half a
+    revolution about z. Rows that are zero or NaN give NaN matrices.
+    """
+    directions = np.asarray(directions, dtype=np.float64)
+    lengths = np.linalg.norm(directions, axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        u = directions / lengths
+
+    # u x e_x = (0, u_z, -u_y) and u . e_x = u_x
+    axis = np.stack([np.zeros(len(u)), u[:, 2], -u[:, 1]], axis=1)
+    cos = u[:, 0]
+    skew = np.zeros((len(u), 3, 3))
+    skew[:, 0, 1], skew[:, 0, 2] = -axis[:, 2], axis[:, 1]
+    skew[:, 1, 0], skew[:, 1, 2] = axis[:, 2], -axis[:, 0]
+    skew[:, 2, 0], skew[:, 2, 1] = -axis[:, 1], axis[:, 0]
+
+    # The anti-parallel rows divide by zero here, they are replaced below
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scale = 1.0 / (1.0 + cos)
+        rotations = np.eye(3) + skew + np.einsum('nij,njk->nik', skew, skew) * scale[:, None, None]
+
+    anti_parallel = cos < -1 + EPSILON
+    rotations[anti_parallel] = np.diag([-1.0, -1.0, 1.0])
+    rotations[~(lengths[:, 0] > EPSILON)] = np.nan
+    return rotations
+
+
+def first_event_per_block(blocks, num_blocks):
+    # Index of the first event of every block (events in file order), -1 for blocks without an event
+    first = np.full(num_blocks, -1, dtype=np.int64)
+    unique_blocks, index = np.unique(blocks, return_index=True)
+    first[unique_blocks] = index
+    return first
+
+
+def block_rotations(reference_blocks, reference_vectors, num_blocks):
+    """
+    (num_blocks x 3 x 3) rotations taking, in every block, the first reference event's vector ((3 x events) like the
+    NewtonPlot stores) onto +x. Blocks without a reference event get NaN matrices.
+    """
+    first = first_event_per_block(reference_blocks, num_blocks)
+    directions = np.full((num_blocks, 3), np.nan)
+    has_reference = first >= 0
+    directions[has_reference] = np.asarray(reference_vectors).T[first[has_reference]]
+    return rotations_to_x(directions)
+
+
+def rotate_events(rotations, event_blocks, vectors):
+    """
+    Rotates every event's vector by the rotation of its block in one einsum. vectors is (... x 3 x events) and
+    event_blocks (... x events), e.g. the NewtonPlot (element x component x event) stores. Events with block -1
+    (padding) come out as NaN.
+    """
+    nan_rotation = np.full((1, 3, 3), np.nan)
+    rotations = np.concatenate([rotations, nan_rotation])  # index -1 picks the NaN rotation
+    return np.einsum('...eij,...je->...ie', rotations[event_blocks], vectors)
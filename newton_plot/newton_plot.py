@@ -1,7 +1,7 @@
 # Python class to generate Newton Plots for coulomb explosion imaging experiments given a moleculeFormations.csv file
+# Run from the repository root: python -m newton_plot.newton_plot
 # Author: Samuel S. Taylor
 
-import csv
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import axes3d
 import numpy as np
@@ -9,6 +9,11 @@ from matplotlib.ticker import MaxNLocator
 from matplotlib.ticker import MultipleLocator
 import os
 import matplotlib as mpl
+from scipy.ndimage import gaussian_filter
+
+from histograms_stats_molecule_formation.molecule_formation_cache import load_fragment_table
+from newton_plot.covariance_map import covariance_map
+from newton_plot.molecular_frame import block_rotations, rotate_events
 
 EPSILON = 1e-10
 
@@ -23,134 +28,89 @@ mpl.rcParams['legend.fontsize'] = 12  # Legend font size
 # either make axis label 14, then ticks and legend 12 # for c4h10
 # or make axis label 16, then ticks and legend 14     # otherwise
 
+# Atomic masses in g/mol, momenta are in A/fs * g/mol
+ATOMIC_MASSES = {
+    'H': 1.00794, 'He': 4.002602,
+    'Li': 6.941, 'Be': 9.012182, 'B': 10.811, 'C': 12.0107, 'N': 14.0067, 'O': 15.9994, 'F': 18.9984032,
+    'Ne': 20.1797,
+    'Na': 22.98976928, 'Mg': 24.305, 'Al': 26.9815386, 'Si': 28.0855, 'P': 30.973762, 'S': 32.065, 'Cl': 35.453,
+    'Ar': 39.948,
+}
+
+# (color, legend label) of each element in the plots, elements not listed here get the next matplotlib cycle color
+ELEMENT_STYLES = {
+    'H': ('r', 'Hydrogen'),
+    'C': ('b', 'Carbon'),
+    'O': ('g', 'Oxygen'),
+    'N': ('y', 'Nitrogen'),
+}
+
+COMPONENTS = {'x': 0, 'y': 1, 'z': 2}
+
+
 class NewtonPlot:
     def __init__(self, SHOW_PLOT=False,SHOW_TITLE=False,SHOW_LEGEND=False):
         # Constants
         self.show_plot = SHOW_PLOT
         self.show_title = SHOW_TITLE
         self.show_legend = SHOW_LEGEND
-        self.h_mass = 1.00794  # in g/mol
-        self.c_mass = 12.0107  # in g/mol
-        self.o_mass = 15.9994  # in g/mol
-        self.n_mass = 14.0067  # in g/mol
         self.axis_subdivide = 5  # Number of sub-divisions on each axis
-        
-        # Dictionary for fragments and data
-        self.fragments_x_vel_data = {}
-        self.fragments_y_vel_data = {}
-        self.fragments_z_vel_data = {}
-        
-        # Lists for carbon velocities in A/fs
-        self.carbon_x_velocities = []
-        self.carbon_y_velocities = []
-        self.carbon_z_velocities = []
-
-        # Lists for hydrogen velocities in A/fs
-        self.hydrogen_x_velocities = []
-        self.hydrogen_y_velocities = []
-        self.hydrogen_z_velocities = []
-        
-        # Lists for oxygen velocities in A/fs
-        self.oxygen_x_velocities = []
-        self.oxygen_y_velocities = []
-        self.oxygen_z_velocities = []
-
-        # Lists for nitrogen velocities in A/fs
-        self.nitrogen_x_velocities = []
-        self.nitrogen_y_velocities = []
-        self.nitrogen_z_velocities = []
-        
-        # Lists for normalized velocities
-        self.carbon_x_velocities_norm = []
-        self.carbon_y_velocities_norm = []
-        self.carbon_z_velocities_norm = []
-        self.hydrogen_x_velocities_norm = []
-        self.hydrogen_y_velocities_norm = []
-        self.hydrogen_z_velocities_norm = []
-        self.oxygen_x_velocities_norm = []
-        self.oxygen_y_velocities_norm = []
-        self.oxygen_z_velocities_norm = []
-        self.nitrogen_x_velocities_norm = []
-        self.nitrogen_y_velocities_norm = []
-        self.nitrogen_z_velocities_norm = []
-
-        # Lists for momentum in A/fs * g/mol
-        self.carbon_x_momentum = []
-        self.carbon_y_momentum = []
-        self.carbon_z_momentum = []
-        self.hydrogen_x_momentum = []
-        self.hydrogen_y_momentum = []
-        self.hydrogen_z_momentum = []
-        self.oxygen_x_momentum = []
-        self.oxygen_y_momentum = []
-        self.oxygen_z_momentum = []
-        self.nitrogen_x_momentum = []
-        self.nitrogen_y_momentum = []
-        self.nitrogen_z_momentum = []
-        
-        # Lists for momentum completely normalized element-wise
-        self.carbon_x_momentum_norm = []
-        self.carbon_y_momentum_norm = []
-        self.carbon_z_momentum_norm = []
-        self.hydrogen_x_momentum_norm = []
-        self.hydrogen_y_momentum_norm = []
-        self.hydrogen_z_momentum_norm = []
-        self.oxygen_x_momentum_norm = []
-        self.oxygen_y_momentum_norm = []
-        self.oxygen_z_momentum_norm = []
-        self.nitrogen_x_momentum_norm = []
-        self.nitrogen_y_momentum_norm = []
-        self.nitrogen_z_momentum_norm = []
-        
+
+        # Raster mode for the 2D plots: instead of one scatter point per event, every element is binned into a
+        # raster_bins x raster_bins grid and drawn as an image (constant cost in the number of events, like a VMI
+        # detector image). raster_quantity is 'velocity' or 'momentum'
+        self.raster = False
+        self.raster_bins = 400
+        self.raster_smooth_sigma = 1.0  # Gaussian smoothing in grid cells, 0 for none
+        self.raster_log_scale = True
+        self.raster_quantity = 'velocity'
+
+        # Single atom fragments found in the data, in plot order, and the number of velocity events of each
+        self.elements = []
+        self.event_counts = np.zeros(0, dtype=np.int64)
+        self.masses = np.zeros(0)  # g/mol, lined up with self.elements
+        self.num_blocks = 0  # Number of simulations (blocks) in the file
+
+        # (element x component x event) stores, NaN padded past each element's event count. Velocities in A/fs,
+        # momenta in A/fs * g/mol. The _norm stores are normalized per element (and per component for velocities)
+        self.velocities = np.zeros((0, 3, 0))
+        self.velocities_norm = np.zeros((0, 3, 0))
+        self.momentum = np.zeros((0, 3, 0))
+        self.momentum_norm = np.zeros((0, 3, 0))
+        # (element x event) simulation block of every event, -1 in the padding
+        self.event_blocks = np.zeros((0, 0), dtype=np.int64)
+
 
     def process_data(self, input_file):
-        with open(input_file, mode='r') as file:
-            csv_reader = csv.reader(file)
-            
-            # Edit the csv_reader so that every row only contains elements with no spaces
-            lines = list(csv_reader)
-            line_skip_num = 9 # this is the number of the info block size. how many lines to skip for every read
-            
-            for i in range(0, len(lines),line_skip_num):
-                fragments_line = lines[i]
-                x_vel_line = lines[i + 4]
-                y_vel_line = lines[i + 5]
-                z_vel_line = lines[i + 6]
-
-                fragments = [frag.split('[')[0].strip() for frag in fragments_line[1:] if frag.strip()]
-                x_velocities = [float(x_vel.strip()) for x_vel in x_vel_line[1:] if x_vel.strip()]
-                y_velocities = [float(y_vel.strip()) for y_vel in y_vel_line[1:] if y_vel.strip()]
-                z_velocities = [float(z_vel.strip()) for z_vel in z_vel_line[1:] if z_vel.strip()]
-
-                for fragment, x_vel, y_vel, z_vel in zip(fragments, x_velocities, y_velocities, z_velocities):
-                    # if it is not in one, its not in any
-                    if fragment not in self.fragments_x_vel_data:
-                        self.fragments_x_vel_data[fragment] = []
-                        self.fragments_y_vel_data[fragment] = []
-                        self.fragments_z_vel_data[fragment] = []
-
-                    self.fragments_x_vel_data[fragment].append(x_vel)
-                    self.fragments_y_vel_data[fragment].append(y_vel)
-                    self.fragments_z_vel_data[fragment].append(z_vel)
-
-
-        # Read the CSV file and extract velocities
-        self.carbon_x_velocities = self.fragments_x_vel_data['C']
-        self.carbon_y_velocities = self.fragments_y_vel_data['C']
-        self.carbon_z_velocities = self.fragments_z_vel_data['C']
-
-        self.hydrogen_x_velocities = self.fragments_x_vel_data['H']
-        self.hydrogen_y_velocities = self.fragments_y_vel_data['H']
-        self.hydrogen_z_velocities = self.fragments_z_vel_data['H']
-        
-        self.oxygen_x_velocities = self.fragments_x_vel_data.get('O', [])
-        self.oxygen_y_velocities = self.fragments_y_vel_data.get('O', [])
-        self.oxygen_z_velocities = self.fragments_z_vel_data.get('O', [])
+        table = load_fragment_table(input_file)
+        has_velocity = ~(np.isnan(table['x_velocities']) | np.isnan(table['y_velocities']) |
+                         np.isnan(table['z_velocities']))
+
+        # Keep the fragments that are a single atom of an element we have a mass for
+        fragments = table['fragments'][has_velocity]
+        velocities = np.stack([table[f'{component}_velocities'][has_velocity] for component in COMPONENTS])
+        blocks = table['block_index'][has_velocity]
+        names = [str(name) for name in np.unique(fragments)]
+        self.elements = sorted((name for name in names if name in ATOMIC_MASSES), key=self.element_sort_key)
+        name_codes = np.array([self.elements.index(name) if name in self.elements else -1 for name in names],
+                              dtype=np.int64)
+        codes = name_codes[np.searchsorted(names, fragments)] if len(fragments) else np.zeros(0, dtype=np.int64)
+        keep = codes >= 0
+        codes, velocities, blocks = codes[keep], velocities[:, keep], blocks[keep]
+
+        # Scatter every event into its element row, keeping the file order within each element
+        order = np.argsort(codes, kind='stable')
+        codes, velocities, blocks = codes[order], velocities[:, order], blocks[order]
+        self.event_counts = np.bincount(codes, minlength=len(self.elements))
+        starts = np.concatenate(([0], np.cumsum(self.event_counts)[:-1]))
+        slots = np.arange(len(codes)) - starts[codes]
+        self.velocities = np.full((len(self.elements), 3, self.event_counts.max(initial=0)), np.nan)
+        self.velocities[codes, :, slots] = velocities.T
+        self.event_blocks = np.full((len(self.elements), self.velocities.shape[2]), -1, dtype=np.int64)
+        self.event_blocks[codes, slots] = blocks
+        self.masses = np.array([ATOMIC_MASSES[element] for element in self.elements])
+        self.num_blocks = len(table['run_ids'])
 
-        self.nitrogen_x_velocities = self.fragments_x_vel_data.get('N', [])
-        self.nitrogen_y_velocities = self.fragments_y_vel_data.get('N', [])
-        self.nitrogen_z_velocities = self.fragments_z_vel_data.get('N', [])
-        
         # Check if the folder exists
         if not os.path.exists('images'):
             # If the folder does not exist, create it
@@ -162,193 +122,128 @@ class NewtonPlot:
         self.normalize_vel_data()
         self.calculate_momentum()
 
-    def normalize_vel_data(self):
-        # Normalize Carbon x-direction velocities
-        c_x_vel_max = abs(max(self.carbon_x_velocities, default=1))
-        c_x_vel_max_temp = abs(min(self.carbon_x_velocities, default=1))
-        if c_x_vel_max_temp > c_x_vel_max:
-            c_x_vel_max = c_x_vel_max_temp
-        self.carbon_x_velocities_norm = [vel / c_x_vel_max for vel in self.carbon_x_velocities]
-        
-        # Normalize Carbon y-direction velocities
-        c_y_vel_max = abs(max(self.carbon_y_velocities, default=1))
-        c_y_vel_max_temp = abs(min(self.carbon_y_velocities, default=1))
-        if c_y_vel_max_temp > c_y_vel_max:
-            c_y_vel_max = c_y_vel_max_temp
-        self.carbon_y_velocities_norm = [vel / c_y_vel_max for vel in self.carbon_y_velocities]
-        
-        # Normalize Carbon z-direction velocities
-        c_z_vel_max = abs(max(self.carbon_z_velocities, default=1))
-        c_z_vel_max_temp = abs(min(self.carbon_z_velocities, default=1))
-        if c_z_vel_max_temp > c_z_vel_max:
-            c_z_vel_max = c_z_vel_max_temp
-        self.carbon_z_velocities_norm = [vel / c_z_vel_max for vel in self.carbon_z_velocities]
-        
-        # Normalize Hydrogen x-direction velocities
-        h_x_vel_max = abs(max(self.hydrogen_x_velocities, default=1))
-        h_x_vel_max_temp = abs(min(self.hydrogen_x_velocities, default=1))
-        if h_x_vel_max_temp > h_x_vel_max:
-            h_x_vel_max = h_x_vel_max_temp
-        self.hydrogen_x_velocities_norm = [vel / h_x_vel_max for vel in self.hydrogen_x_velocities]
-        
-        # Normalize Hydrogen y-direction velocities
-        h_y_vel_max = abs(max(self.hydrogen_y_velocities, default=1))
-        h_y_vel_max_temp = abs(min(self.hydrogen_y_velocities, default=1))
-        if h_y_vel_max_temp > h_y_vel_max:
-            h_y_vel_max = h_y_vel_max_temp
-        self.hydrogen_y_velocities_norm = [vel / h_y_vel_max for vel in self.hydrogen_y_velocities]
-        
-        # Normalize Hydrogen z-direction velocities
-        h_z_vel_max = abs(max(self.hydrogen_z_velocities, default=1))
-        h_z_vel_max_temp = abs(min(self.hydrogen_z_velocities, default=1))
-        if h_z_vel_max_temp > h_z_vel_max:
-            h_z_vel_max = h_z_vel_max_temp
-        self.hydrogen_z_velocities_norm = [vel / h_z_vel_max for vel in self.hydrogen_z_velocities]
-
-        # Normalize Oxygen x-direction velocities
-        o_x_vel_max = abs(max(self.oxygen_x_velocities, default=1))
-        o_x_vel_max_temp = abs(min(self.oxygen_x_velocities, default=1))
-        if o_x_vel_max_temp > o_x_vel_max:
-            o_x_vel_max = o_x_vel_max_temp
-        self.oxygen_x_velocities_norm = [vel / o_x_vel_max for vel in self.oxygen_x_velocities]
-        
-        # Normalize Oxygen y-direction velocities
-        o_y_vel_max = abs(max(self.oxygen_y_velocities, default=1))
-        o_y_vel_max_temp = abs(min(self.oxygen_y_velocities, default=1))
-        if o_y_vel_max_temp > o_y_vel_max:
-            o_y_vel_max = o_y_vel_max_temp
-        self.oxygen_y_velocities_norm = [vel / o_y_vel_max for vel in self.oxygen_y_velocities]
-        
-        # Normalize Oxygen z-direction velocities
-        o_z_vel_max = abs(max(self.oxygen_z_velocities, default=1))
-        o_z_vel_max_temp = abs(min(self.oxygen_z_velocities, default=1))
-        if o_z_vel_max_temp > o_z_vel_max:
-            o_z_vel_max = o_z_vel_max_temp
-        self.oxygen_z_velocities_norm = [vel / o_z_vel_max for vel in self.oxygen_z_velocities]
-
-        # Normalize Nitrogen x-direction velocities
-        n_x_vel_max = abs(max(self.nitrogen_x_velocities, default=1))
-        n_x_vel_max_temp = abs(min(self.nitrogen_x_velocities, default=1))
-        if n_x_vel_max_temp > n_x_vel_max:
-            n_x_vel_max = n_x_vel_max_temp
-        self.nitrogen_x_velocities_norm = [vel / n_x_vel_max for vel in self.nitrogen_x_velocities]
-        
-        # Normalize Nitrogen y-direction velocities
-        n_y_vel_max = abs(max(self.nitrogen_y_velocities, default=1))
-        n_y_vel_max_temp = abs(min(self.nitrogen_y_velocities, default=1))
-        if n_y_vel_max_temp > n_y_vel_max:
-            n_y_vel_max = n_y_vel_max_temp
-        self.nitrogen_y_velocities_norm = [vel / n_y_vel_max for vel in self.nitrogen_y_velocities]
-        
-        # Normalize Nitrogen z-direction velocities
-        n_z_vel_max = abs(max(self.nitrogen_z_velocities, default=1))
-        n_z_vel_max_temp = abs(min(self.nitrogen_z_velocities, default=1))
-        if n_z_vel_max_temp > n_z_vel_max:
-            n_z_vel_max = n_z_vel_max_temp
-        self.nitrogen_z_velocities_norm = [vel / n_z_vel_max for vel in self.nitrogen_z_velocities]
-
-
-    def calculate_momentum(self):
-        # Momentums in A/fs * g/mol
-        self.carbon_x_momentum = [vel * self.c_mass for vel in self.carbon_x_velocities]
-        self.carbon_y_momentum = [vel * self.c_mass for vel in self.carbon_y_velocities]
-        self.carbon_z_momentum = [vel * self.c_mass for vel in self.carbon_z_velocities]
-        self.hydrogen_x_momentum = [vel * self.h_mass for vel in self.hydrogen_x_velocities]
-        self.hydrogen_y_momentum = [vel * self.h_mass for vel in self.hydrogen_y_velocities]
-        self.hydrogen_z_momentum = [vel * self.h_mass for vel in self.hydrogen_z_velocities]
-        self.oxygen_x_momentum = [vel * self.o_mass for vel in self.oxygen_x_velocities]
-        self.oxygen_y_momentum = [vel * self.o_mass for vel in self.oxygen_y_velocities]
-        self.oxygen_z_momentum = [vel * self.o_mass for vel in self.oxygen_z_velocities]
-        self.nitrogen_x_momentum = [vel * self.n_mass for vel in self.nitrogen_x_velocities]
-        self.nitrogen_y_momentum = [vel * self.n_mass for vel in self.nitrogen_y_velocities]
-        self.nitrogen_z_momentum = [vel * self.n_mass for vel in self.nitrogen_z_velocities]
-
-        # List of all the max values needed to normalize all the momentum lists
-        c_maximums = []
-        
-        c_maximums.append(abs(max(self.carbon_x_momentum, default=1)))
-        c_maximums.append(abs(min(self.carbon_x_momentum, default=1)))
-        c_maximums.append(abs(max(self.carbon_y_momentum, default=1)))
-        c_maximums.append(abs(min(self.carbon_y_momentum, default=1)))
-        c_maximums.append(abs(max(self.carbon_z_momentum, default=1)))
-        c_maximums.append(abs(min(self.carbon_z_momentum, default=1)))
-        
-        c_absolute_max_val = max(c_maximums)
-        
-        h_maximums = []
-        
-        h_maximums.append(abs(max(self.hydrogen_x_momentum, default=1)))
-        h_maximums.append(abs(min(self.hydrogen_x_momentum, default=1)))
-        h_maximums.append(abs(max(self.hydrogen_y_momentum, default=1)))
-        h_maximums.append(abs(min(self.hydrogen_y_momentum, default=1)))
-        h_maximums.append(abs(max(self.hydrogen_z_momentum, default=1)))
-        h_maximums.append(abs(min(self.hydrogen_z_momentum, default=1)))
-        
-        h_absolute_max_val = max(h_maximums)
+    @staticmethod
+    def element_sort_key(element):
+        # The elements with a fixed style first (in ELEMENT_STYLES order), then the rest by atomic mass
+        styled = list(ELEMENT_STYLES)
+        return (0, styled.index(element)) if element in styled else (1, ATOMIC_MASSES[element])
+
+    def element_style(self, element):
+        if element in ELEMENT_STYLES:
+            return ELEMENT_STYLES[element]
+        unstyled = [other for other in self.elements if other not in ELEMENT_STYLES]
+        return f'C{unstyled.index(element) % 10}', element
+
+    def element_velocities(self, element, normalize=False):
+        # (3 x events) velocities of one element, an empty (3 x 0) array if the element is not in the data
+        if element not in self.elements:
+            return np.zeros((3, 0))
+        i = self.elements.index(element)
+        store = self.velocities_norm if normalize else self.velocities
+        return store[i, :, :self.event_counts[i]]
+
+    def element_momentum(self, element, normalize=False):
+        if element not in self.elements:
+            return np.zeros((3, 0))
+        i = self.elements.index(element)
+        store = self.momentum_norm if normalize else self.momentum
+        return store[i, :, :self.event_counts[i]]
+
+    def to_molecular_frame(self, reference_element='C'):
+        """
+        Rotates every event into the molecular frame of its simulation: in each block the first reference_element
+        fragment's velocity (and so its momentum) is turned onto +x and every other event of that block gets the same
+        rotation. All rotations are built and applied at once. Events of blocks without a reference_element fragment
+        become NaN, which the plots leave out. The normalized and momentum stores are recomputed, so all the plots
+        afterwards are in the molecular frame.
+        """
+        if reference_element not in self.elements:
+            raise ValueError(f"No '{reference_element}' fragments to define the molecular frame")
+        rotations = block_rotations(self.element_blocks(reference_element),
+                                    self.element_velocities(reference_element), self.num_blocks)
+        self.velocities = rotate_events(rotations, self.event_blocks, self.velocities)
+        self.normalize_vel_data()
+        self.calculate_momentum()
 
-        o_maximums = []
-        
-        o_maximums.append(abs(max(self.oxygen_x_momentum, default=1)))
-        o_maximums.append(abs(min(self.oxygen_x_momentum, default=1)))
-        o_maximums.append(abs(max(self.oxygen_y_momentum, default=1)))
-        o_maximums.append(abs(min(self.oxygen_y_momentum, default=1)))
-        o_maximums.append(abs(max(self.oxygen_z_momentum, default=1)))
-        o_maximums.append(abs(min(self.oxygen_z_momentum, default=1)))
-        
-        o_absolute_max_val = max(o_maximums)
+    def element_blocks(self, element):
+        # Simulation block of each of the element's events, lined up with element_velocities / element_momentum
+        if element not in self.elements:
+            return np.zeros(0, dtype=np.int64)
+        i = self.elements.index(element)
+        return self.event_blocks[i, :self.event_counts[i]]
+
+    @staticmethod
+    def _largest_magnitude(store, axis):
+        # Largest |value| over axis ignoring the NaN padding, 1 where there is nothing (so empty rows are unchanged)
+        magnitude = np.abs(store)
+        largest = np.max(np.where(np.isnan(magnitude), -np.inf, magnitude), axis=axis, keepdims=True,
+                         initial=-np.inf)
+        return np.where(np.isfinite(largest), largest, 1.0)
 
-        n_maximums = []
-        
-        n_maximums.append(abs(max(self.nitrogen_x_momentum, default=1)))
-        n_maximums.append(abs(min(self.nitrogen_x_momentum, default=1)))
-        n_maximums.append(abs(max(self.nitrogen_y_momentum, default=1)))
-        n_maximums.append(abs(min(self.nitrogen_y_momentum, default=1)))
-        n_maximums.append(abs(max(self.nitrogen_z_momentum, default=1)))
-        n_maximums.append(abs(min(self.nitrogen_z_momentum, default=1)))
-        
-        n_absolute_max_val = max(n_maximums)
-
-        # Create the normalized lists of momentum
-        self.carbon_x_momentum_norm = [val / c_absolute_max_val for val in self.carbon_x_momentum]
-        self.carbon_y_momentum_norm = [val / c_absolute_max_val for val in self.carbon_y_momentum]
-        self.carbon_z_momentum_norm = [val / c_absolute_max_val for val in self.carbon_z_momentum]
-        self.hydrogen_x_momentum_norm = [val / h_absolute_max_val for val in self.hydrogen_x_momentum]
-        self.hydrogen_y_momentum_norm = [val / h_absolute_max_val for val in self.hydrogen_y_momentum]
-        self.hydrogen_z_momentum_norm = [val / h_absolute_max_val for val in self.hydrogen_z_momentum]
-        self.oxygen_x_momentum_norm = [val / o_absolute_max_val for val in self.oxygen_x_momentum]
-        self.oxygen_y_momentum_norm = [val / o_absolute_max_val for val in self.oxygen_y_momentum]
-        self.oxygen_z_momentum_norm = [val / o_absolute_max_val for val in self.oxygen_z_momentum]
-        self.nitrogen_x_momentum_norm = [val / n_absolute_max_val for val in self.nitrogen_x_momentum]
-        self.nitrogen_y_momentum_norm = [val / n_absolute_max_val for val in self.nitrogen_y_momentum]
-        self.nitrogen_z_momentum_norm = [val / n_absolute_max_val for val in self.nitrogen_z_momentum]
+    def normalize_vel_data(self):
+        # Every element / component divided by its largest |velocity|
+        self.velocities_norm = self.velocities / self._largest_magnitude(self.velocities, axis=2)
 
-    def plot_x_y_velocities(self, normalize=False, graph_name_tag='', graph_xy_title='', alpha=0.03,
-                            lim_2d_left=-1,lim_2d_right=1,lim_2d_bottom=-1,lim_2d_top=1):
-        if normalize:
-            carbon_x_vel = self.carbon_x_velocities_norm
-            carbon_y_vel = self.carbon_y_velocities_norm
-            hydrogen_x_vel = self.hydrogen_x_velocities_norm
-            hydrogen_y_vel = self.hydrogen_y_velocities_norm
-            oxygen_x_vel = self.oxygen_x_velocities_norm
-            oxygen_y_vel = self.oxygen_y_velocities_norm
-            nitrogen_x_vel = self.nitrogen_x_velocities_norm
-            nitrogen_y_vel = self.nitrogen_y_velocities_norm
+    def calculate_momentum(self):
+        # Momentums in A/fs * g/mol, normalized by the largest |momentum| of each element over all components
+        self.momentum = self.velocities * self.masses[:, None, None]
+        self.momentum_norm = self.momentum / self._largest_magnitude(self.momentum, axis=(1, 2))
+
+    def velocity_raster(self, element, first, second, extent, normalize=False, quantity='velocity', bins=400,
+                        smooth_sigma=0.0, log_scale=False):
+        """
+        Bins one element's (first, second) velocity or momentum components into a bins x bins grid over
+        extent = (left, right, bottom, top) with a single bincount. Rows of the returned image follow the second
+        component, columns the first (the layout imshow(origin='lower') expects). Events outside extent are dropped.
+        """
+        if quantity == 'velocity':
+            values = self.element_velocities(element, normalize)
+        elif quantity == 'momentum':
+            values = self.element_momentum(element, normalize)
+        else:
+            raise ValueError(f"quantity must be 'velocity' or 'momentum', not '{quantity}'")
+
+        left, right, bottom, top = extent
+        columns = (values[COMPONENTS[first]] - left) / (right - left) * bins
+        rows = (values[COMPONENTS[second]] - bottom) / (top - bottom) * bins
+        inside = (columns >= 0) & (columns < bins) & (rows >= 0) & (rows < bins)
+        flat_index = rows[inside].astype(np.int64) * bins + columns[inside].astype(np.int64)
+        image = np.bincount(flat_index, minlength=bins * bins).reshape(bins, bins).astype(np.float64)
+
+        if smooth_sigma > 0:
+            image = gaussian_filter(image, smooth_sigma)
+        if log_scale:
+            image = np.log1p(image)
+        return image
+
+    def plot_velocities(self, first, second, normalize=False, graph_name_tag='', graph_title='', alpha=0.03,
+                        lim_2d_left=-1,lim_2d_right=1,lim_2d_bottom=-1,lim_2d_top=1):
+        # One velocity (or momentum, see raster_quantity) component against another ('x', 'y' or 'z') for every
+        # element, as a scatter plot or, with self.raster, as one density image per element
+        quantity = self.raster_quantity if self.raster else 'velocity'
+        extent = (lim_2d_left, lim_2d_right, lim_2d_bottom, lim_2d_top)
+        for element in self.elements:
+            color, label = self.element_style(element)
+            if self.raster:
+                image = self.velocity_raster(element, first, second, extent, normalize=normalize, quantity=quantity,
+                                             bins=self.raster_bins, smooth_sigma=self.raster_smooth_sigma,
+                                             log_scale=self.raster_log_scale)
+                # The element color everywhere, with the (0 to 1 scaled) density as the opacity
+                rgba = np.zeros(image.shape + (4,))
+                rgba[..., :3] = mpl.colors.to_rgb(color)
+                rgba[..., 3] = image / image.max() if image.max() > 0 else 0
+                plt.imshow(rgba, origin='lower', extent=extent, aspect='auto', interpolation='nearest')
+                plt.scatter([], [], color=color, label=label)  # legend entry
+            else:
+                velocities = self.element_velocities(element, normalize)
+                plt.scatter(velocities[COMPONENTS[first]], velocities[COMPONENTS[second]], color=color, alpha=alpha,
+                            label=label)
+        if quantity == 'momentum':
+            plt.xlabel(f'{first.upper()} Momentum (Å/fs · g/mol)')
+            plt.ylabel(f'{second.upper()} Momentum (Å/fs · g/mol)')
         else:
-            carbon_x_vel = self.carbon_x_velocities
-            carbon_y_vel = self.carbon_y_velocities
-            hydrogen_x_vel = self.hydrogen_x_velocities
-            hydrogen_y_vel = self.hydrogen_y_velocities
-            oxygen_x_vel = self.oxygen_x_velocities
-            oxygen_y_vel = self.oxygen_y_velocities
-            nitrogen_x_vel = self.nitrogen_x_velocities
-            nitrogen_y_vel = self.nitrogen_y_velocities
-
-        plt.scatter(hydrogen_x_vel, hydrogen_y_vel, color='r', alpha=alpha, label='Hydrogen')
-        plt.scatter(carbon_x_vel, carbon_y_vel, color='b', alpha=alpha, label='Carbon')
-        plt.scatter(oxygen_x_vel, oxygen_y_vel, color='g', alpha=alpha, label='Oxygen')
-        plt.scatter(nitrogen_x_vel, nitrogen_y_vel, color='y', alpha=alpha, label='Nitrogen')
-        plt.xlabel('X Velocity (Å/fs)')
-        plt.ylabel('Y Velocity (Å/fs)')
+            plt.xlabel(f'{first.upper()} Velocity (Å/fs)')
+            plt.ylabel(f'{second.upper()} Velocity (Å/fs)')
         plt.xlim(lim_2d_left, lim_2d_right)
         plt.ylim(lim_2d_bottom, lim_2d_top)
         if self.show_legend:
@@ -357,125 +252,89 @@ class NewtonPlot:
         # Add light vertical and horizontal lines at each of the tick marks
         plt.grid(True, which='both', linestyle='--', linewidth=0.5, color='gray', alpha=0.7)
         
+        file_tag = 'momentum' if quantity == 'momentum' else 'velocities'
         if normalize:
-            if self.show_title:
-                plt.title(graph_xy_title + ' Normalized')
-            plt.tight_layout()
-            plt.savefig(f'images/x_y_velocities_norm_{graph_name_tag}.png')
-        else:
-            if self.show_title:
-                plt.title(graph_xy_title)
-            plt.tight_layout()
-            plt.savefig(f'images/x_y_velocities_{graph_name_tag}.png')
+            file_tag += '_norm'
+        if self.raster:
+            file_tag += '_raster'
+
+        if self.show_title:
+            plt.title(graph_title + ' Normalized' if normalize else graph_title)
+        plt.tight_layout()
+        plt.savefig(f'images/{first}_{second}_{file_tag}_{graph_name_tag}.png')
         
         if self.show_plot:
             plt.show()
         plt.close()
 
-    def plot_x_z_velocities(self, normalize=False, graph_name_tag='', graph_xz_title='', alpha=0.03,
+    def plot_x_y_velocities(self, normalize=False, graph_name_tag='', graph_xy_title='', alpha=0.03,
                             lim_2d_left=-1,lim_2d_right=1,lim_2d_bottom=-1,lim_2d_top=1):
-        if normalize:
-            carbon_x_vel = self.carbon_x_velocities_norm
-            carbon_z_vel = self.carbon_z_velocities_norm
-            hydrogen_x_vel = self.hydrogen_x_velocities_norm
-            hydrogen_z_vel = self.hydrogen_z_velocities_norm
-            oxygen_x_vel = self.oxygen_x_velocities_norm
-            oxygen_z_vel = self.oxygen_z_velocities_norm
-            nitrogen_x_vel = self.nitrogen_x_velocities_norm
-            nitrogen_z_vel = self.nitrogen_z_velocities_norm
-        else:
-            carbon_x_vel = self.carbon_x_velocities
-            carbon_z_vel = self.carbon_z_velocities
-            hydrogen_x_vel = self.hydrogen_x_velocities
-            hydrogen_z_vel = self.hydrogen_z_velocities
-            oxygen_x_vel = self.oxygen_x_velocities
-            oxygen_z_vel = self.oxygen_z_velocities
-            nitrogen_x_vel = self.nitrogen_x_velocities
-            nitrogen_z_vel = self.nitrogen_z_velocities
-
-        plt.scatter(hydrogen_x_vel, hydrogen_z_vel, color='r', alpha=alpha, label='Hydrogen')
-        plt.scatter(carbon_x_vel, carbon_z_vel, color='b', alpha=alpha, label='Carbon')
-        plt.scatter(oxygen_x_vel, oxygen_z_vel, color='g', alpha=alpha, label='Oxygen')
-        plt.scatter(nitrogen_x_vel, nitrogen_z_vel, color='y', alpha=alpha, label='Nitrogen')
-        plt.xlabel('X Velocity (Å/fs)')
-        plt.ylabel('Z Velocity (Å/fs)')
-        plt.xlim(lim_2d_left, lim_2d_right)
-        plt.ylim(lim_2d_bottom, lim_2d_top)
-        if self.show_legend:
-            plt.legend()
-
-        plt.grid(True, which='both', linestyle='--', linewidth=0.5, color='gray', alpha=0.7)
+        self.plot_velocities('x', 'y', normalize=normalize, graph_name_tag=graph_name_tag, graph_title=graph_xy_title,
+                             alpha=alpha, lim_2d_left=lim_2d_left, lim_2d_right=lim_2d_right,
+                             lim_2d_bottom=lim_2d_bottom, lim_2d_top=lim_2d_top)
 
-        if normalize:
-            if self.show_title:
-                plt.title(graph_xz_title + ' Normalized')
-            plt.tight_layout()
-            plt.savefig(f'images/x_z_velocities_norm_{graph_name_tag}.png')
-        else:
-            if self.show_title:
-                plt.title(graph_xz_title)
-            plt.tight_layout()
-            plt.savefig(f'images/x_z_velocities_{graph_name_tag}.png')
-        
-        if self.show_plot:
-            plt.show()
-        plt.close()
+    def plot_x_z_velocities(self, normalize=False, graph_name_tag='', graph_xz_title='', alpha=0.03,
+                            lim_2d_left=-1,lim_2d_right=1,lim_2d_bottom=-1,lim_2d_top=1):
+        self.plot_velocities('x', 'z', normalize=normalize, graph_name_tag=graph_name_tag, graph_title=graph_xz_title,
+                             alpha=alpha, lim_2d_left=lim_2d_left, lim_2d_right=lim_2d_right,
+                             lim_2d_bottom=lim_2d_bottom, lim_2d_top=lim_2d_top)
 
     def plot_y_z_velocities(self, normalize=False, graph_name_tag='', graph_yz_title='', alpha=0.03,
                             lim_2d_left=-1,lim_2d_right=1,lim_2d_bottom=-1,lim_2d_top=1):
-        if normalize:
-            carbon_y_vel = self.carbon_y_velocities_norm
-            carbon_z_vel = self.carbon_z_velocities_norm
-            hydrogen_y_vel = self.hydrogen_y_velocities_norm
-            hydrogen_z_vel = self.hydrogen_z_velocities_norm
-            oxygen_y_vel = self.oxygen_y_velocities_norm
-            oxygen_z_vel = self.oxygen_z_velocities_norm
-            nitrogen_y_vel = self.nitrogen_y_velocities_norm
-            nitrogen_z_vel = self.nitrogen_z_velocities_norm
-        else:
-            carbon_y_vel = self.carbon_y_velocities
-            carbon_z_vel = self.carbon_z_velocities
-            hydrogen_y_vel = self.hydrogen_y_velocities
-            hydrogen_z_vel = self.hydrogen_z_velocities
-            oxygen_y_vel = self.oxygen_y_velocities
-            oxygen_z_vel = self.oxygen_z_velocities
-            nitrogen_y_vel = self.nitrogen_y_velocities
-            nitrogen_z_vel = self.nitrogen_z_velocities
-
-        plt.scatter(hydrogen_y_vel, hydrogen_z_vel, color='r', alpha=alpha, label='Hydrogen')
-        plt.scatter(carbon_y_vel, carbon_z_vel, color='b', alpha=alpha, label='Carbon')
-        plt.scatter(oxygen_y_vel, oxygen_z_vel, color='g', alpha=alpha, label='Oxygen')
-        plt.scatter(nitrogen_y_vel, nitrogen_z_vel, color='y', alpha=alpha, label='Nitrogen')
-        plt.xlabel('Y Velocity (Å/fs)')
-        plt.ylabel('Z Velocity (Å/fs)')
-        plt.xlim(lim_2d_left, lim_2d_right)
-        plt.ylim(lim_2d_bottom, lim_2d_top)
-        if self.show_legend:
-            plt.legend()
- 
-        plt.grid(True, which='both', linestyle='--', linewidth=0.5, color='gray', alpha=0.7)
-       
-        if normalize:
-            if self.show_title:
-                plt.title(graph_yz_title + ' Normalized')
-            plt.tight_layout()
-            plt.savefig(f'images/y_z_velocities_norm_{graph_name_tag}.png')
+        self.plot_velocities('y', 'z', normalize=normalize, graph_name_tag=graph_name_tag, graph_title=graph_yz_title,
+                             alpha=alpha, lim_2d_left=lim_2d_left, lim_2d_right=lim_2d_right,
+                             lim_2d_bottom=lim_2d_bottom, lim_2d_top=lim_2d_top)
+
+    def momentum_covariance_map(self, first_element, second_element, axis='x', num_bins=100, limit=None):
+        """
+        Covariance map between the momenta of two single atom channels (e.g. C vs H) along axis (the polarization
+        axis), with each simulation block as one event. Momenta are binned from -limit to limit, by default the
+        largest |momentum| of the two channels along axis. Returns a covariance_map.CovarianceMap.
+        """
+        first = self.element_momentum(first_element)[COMPONENTS[axis]]
+        second = self.element_momentum(second_element)[COMPONENTS[axis]]
+        if limit is None:
+            limit = max(np.abs(first).max(initial=0), np.abs(second).max(initial=0)) or 1.0
+        bins = np.linspace(-limit, limit, num_bins + 1)
+        return covariance_map(self.element_blocks(first_element), first, self.element_blocks(second_element), second,
+                              self.num_blocks, bins, bins)
+
+    def plot_covariance_map(self, first_element, second_element, axis='x', num_bins=100, limit=None,
+                            coincidence=False, graph_name_tag='', graph_title=''):
+        # Covariance (or plain coincidence) map of first_element (x axis) against second_element (y axis) momenta
+        cov_map = self.momentum_covariance_map(first_element, second_element, axis=axis, num_bins=num_bins,
+                                               limit=limit)
+        extent = (cov_map.bins_a[0], cov_map.bins_a[-1], cov_map.bins_b[0], cov_map.bins_b[-1])
+        _, first_label = self.element_style(first_element)
+        _, second_label = self.element_style(second_element)
+
+        plt.figure()
+        if coincidence:
+            plt.imshow(cov_map.coincidence.T, origin='lower', extent=extent, aspect='auto', cmap='viridis')
+            map_name = 'coincidence'
         else:
-            if self.show_title:
-                plt.title(graph_yz_title)
-            plt.tight_layout()
-            plt.savefig(f'images/y_z_velocities_{graph_name_tag}.png')
-        
+            # Symmetric color scale so zero covariance is white
+            largest = np.abs(cov_map.covariance).max() or 1.0
+            plt.imshow(cov_map.covariance.T, origin='lower', extent=extent, aspect='auto', cmap='bwr',
+                       vmin=-largest, vmax=largest)
+            map_name = 'covariance'
+        plt.colorbar(label=map_name.capitalize())
+        plt.xlabel(f'{first_label} {axis.upper()} Momentum (Å/fs · g/mol)')
+        plt.ylabel(f'{second_label} {axis.upper()} Momentum (Å/fs · g/mol)')
+        if self.show_title:
+            plt.title(graph_title)
+        plt.tight_layout()
+        plt.savefig(f'images/{map_name}_{first_element}_{second_element}_{axis}_{graph_name_tag}.png')
+
         if self.show_plot:
             plt.show()
         plt.close()
+        return cov_map
 
     def plot_3d_projections_basic(self):
         # from: https://stackoverflow.com/questions/26739670/plotting-the-projection-of-3d-plot-in-three-planes-using-contours
-        # Convert the carbon velocities lists to NumPy arrays for easier manipulation
-        X = np.array(self.carbon_x_velocities)
-        Y = np.array(self.carbon_y_velocities)
-        Z = np.array(self.carbon_z_velocities)
+        # Carbon velocities as NumPy arrays
+        X, Y, Z = self.element_velocities('C')
         
         # Create a new figure for the first 3D plot
         plt.figure()
@@ -534,33 +393,14 @@ class NewtonPlot:
                                      alpha=0.03, lim_3d_x_lower=-1, lim_3d_x_upper=1,
                                      lim_3d_y_lower=-1,lim_3d_y_upper=1,
                                      lim_3d_z_lower=-1,lim_3d_z_upper=1):
-        # Convert the carbon velocities lists to NumPy arrays for easier manipulation
-        
-        C_X = np.array(self.carbon_x_velocities)
-        C_Y = np.array(self.carbon_y_velocities)
-        C_Z = np.array(self.carbon_z_velocities)
-        
-        H_X = np.array(self.hydrogen_x_velocities)
-        H_Y = np.array(self.hydrogen_y_velocities)
-        H_Z = np.array(self.hydrogen_z_velocities)
-        
-        O_X = np.array(self.oxygen_x_velocities)
-        O_Y = np.array(self.oxygen_y_velocities)
-        O_Z = np.array(self.oxygen_z_velocities)
-        
-        N_X = np.array(self.nitrogen_x_velocities)
-        N_Y = np.array(self.nitrogen_y_velocities)
-        N_Z = np.array(self.nitrogen_z_velocities)
-        
         # Create a new figure for the first 3D plot
         fig1 = plt.figure()
         ax1 = fig1.add_subplot(111, projection='3d')  # Create a 3D subplot
 
-        # Scatter plot of the carbon velocities in 3D space
-        ax1.scatter(H_X, H_Y, H_Z, c='r', marker='.', label='Hydrogen', alpha=alpha)  # Plot with red dots, slightly transparent
-        ax1.scatter(C_X, C_Y, C_Z, c='b', marker='.', label='Carbon', alpha=alpha)  # Plot with blue dots, slightly transparent
-        ax1.scatter(O_X, O_Y, O_Z, c='g', marker='.', label='Oxygen', alpha=alpha)  # Plot with blue dots, slightly transparent
-        ax1.scatter(N_X, N_Y, N_Z, c='y', marker='.', label='Nitrogen', alpha=alpha)  # Plot with red dots, slightly transparent
+        # Scatter plot of the velocities of every element in 3D space
+        for element in self.elements:
+            color, label = self.element_style(element)
+            ax1.scatter(*self.element_velocities(element), c=color, marker='.', label=label, alpha=alpha)
 
         ax1.set_xlabel('X Velocity (Å/fs)', fontweight='bold')  # Set the label for the X-axis
         ax1.set_ylabel('Y Velocity (Å/fs)', fontweight='bold')  # Set the label for the Y-axis
@@ -600,44 +440,14 @@ class NewtonPlot:
 
         plt.hot()  # Use the 'hot' colormap
 
-        # Calculate constant arrays for the projections of carbon
-        cx = np.ones_like(C_X) * lim_3d_x_lower  # Constant X for YZ projection at the left edge of the plot
-        cy = np.ones_like(C_Y) * lim_3d_y_upper  # Constant Y for XZ projection at the top edge of the plot
-        cz = np.ones_like(C_Z) * lim_3d_z_lower  # Constant Z for XY projection at the bottom edge of the plot
-        
-        # Calculate constant arrays for the projections of hydrogen
-        c_hx = np.ones_like(H_X) * lim_3d_x_lower  # Constant X for YZ projection at the left edge of the plot
-        c_hy = np.ones_like(H_Y) * lim_3d_y_upper  # Constant Y for XZ projection at the top edge of the plot
-        c_hz = np.ones_like(H_Z) * lim_3d_z_lower  # Constant Z for XY projection at the bottom edge of the plot
-        
-        c_ox = np.ones_like(O_X) * lim_3d_x_lower  # Constant X for YZ projection at the left edge of the plot
-        c_oy = np.ones_like(O_Y) * lim_3d_y_upper  # Constant Y for XZ projection at the top edge of the plot
-        c_oz = np.ones_like(O_Z) * lim_3d_z_lower  # Constant Z for XY projection at the bottom edge of the plot
-
-        c_nx = np.ones_like(N_X) * lim_3d_x_lower  # Constant X for YZ projection at the left edge of the plot
-        c_ny = np.ones_like(N_Y) * lim_3d_y_upper  # Constant Y for XZ projection at the top edge of the plot
-        c_nz = np.ones_like(N_Z) * lim_3d_z_lower  # Constant Z for XY projection at the bottom edge of the plot
-
-        
-        # Scatter plots for the projections onto the XY, XZ, and YZ planes of hydrogen
-        ax2.scatter(H_X, H_Y, c_hz, c='r', marker='.', lw=0, alpha=alpha)  # XY projection, color by Z
-        ax2.scatter(H_X, c_hy, H_Z, c='r', marker='.', lw=0, alpha=alpha)  # XZ projection, color by negative Y
-        ax2.scatter(c_hx, H_Y, H_Z, c='r', marker='.', lw=0, alpha=alpha)  # YZ projection, color by X
-        
-        # Scatter plots for the projections onto the XY, XZ, and YZ planes of oxygen
-        ax2.scatter(O_X, O_Y, c_oz, c='g', marker='.', lw=0, alpha=alpha)  # XY projection, color by Z
-        ax2.scatter(O_X, c_oy, O_Z, c='g', marker='.', lw=0, alpha=alpha)  # XZ projection, color by negative Y
-        ax2.scatter(c_ox, O_Y, O_Z, c='g', marker='.', lw=0, alpha=alpha)  # YZ projection, color by X
-
-        # Scatter plots for the projections onto the XY, XZ, and YZ planes of nitrogen
-        ax2.scatter(N_X, N_Y, c_nz, c='y', marker='.', lw=0, alpha=alpha)  # XY projection, color by Z
-        ax2.scatter(N_X, c_ny, N_Z, c='y', marker='.', lw=0, alpha=alpha)  # XZ projection, color by negative Y
-        ax2.scatter(c_nx, N_Y, N_Z, c='y', marker='.', lw=0, alpha=alpha)  # YZ projection, color by X
-
-        # Scatter plots for the projections onto the XY, XZ, and YZ planes of carbon
-        ax2.scatter(C_X, C_Y, cz, c='b', marker='.', lw=0, alpha=alpha)  # XY projection, color by Z
-        ax2.scatter(C_X, cy, C_Z, c='b', marker='.', lw=0, alpha=alpha)  # XZ projection, color by negative Y
-        ax2.scatter(cx, C_Y, C_Z, c='b', marker='.', lw=0, alpha=alpha)  # YZ projection, color by X
+        # Scatter plots for the projections onto the XY, XZ, and YZ planes of every element (carbon drawn last).
+        # The projections sit at the left (X), top (Y) and bottom (Z) edges of the plot
+        for element in sorted(self.elements, key=lambda element: element == 'C'):
+            x, y, z = self.element_velocities(element)
+            color, _ = self.element_style(element)
+            ax2.scatter(x, y, np.full_like(z, lim_3d_z_lower), c=color, marker='.', lw=0, alpha=alpha)  # XY projection
+            ax2.scatter(x, np.full_like(y, lim_3d_y_upper), z, c=color, marker='.', lw=0, alpha=alpha)  # XZ projection
+            ax2.scatter(np.full_like(x, lim_3d_x_lower), y, z, c=color, marker='.', lw=0, alpha=alpha)  # YZ projection
         
         # Set the limits of the second plot to be the same as the first plot
         ax2.set_xlim3d(lim_3d_x_lower, lim_3d_x_upper)
@@ -711,6 +521,8 @@ def main():
     lim_3d_z_lower=-1.0
     lim_3d_z_upper=1.0
     newton_plot.axis_subdivide = 4    
+    newton_plot.raster = False  # True for density images instead of scatter points (for merged runs)
+    molecular_frame_reference = None  # e.g. 'C' to rotate every simulation so its first C flies along +x
 
     if (data_mode.lower().startswith('c')):
         #CLASSICAL INPUT FILE:
@@ -728,6 +540,9 @@ def main():
     print("Searching for input file: ", input_file)
 
     newton_plot.process_data(input_file)
+    if molecular_frame_reference:
+        newton_plot.to_molecular_frame(molecular_frame_reference)
+        graph_name_tag += f"_molecular_frame_{molecular_frame_reference}"
     
     print("Generating Plots...")
     # 2-d velocity projections
@@ -1,17 +1,18 @@
-import csv
+# Run from the repository root: python -m newton_plot.speed_distribution
 import matplotlib.pyplot as plt
 
+from histograms_stats_molecule_formation.molecule_formation_reader import read_blocks
+
 # Function to read speeds from a CSV file
 def read_speeds(file_path):
     speeds = {'C[0]': [], 'C[1]': [], 'H[2]': [], 'H[3]': []}
-    with open(file_path, 'r') as file:
-        reader = csv.reader(file)
-        for row in reader:
-            if 'Speed[A/fs]' in row:
-                speeds['C[0]'].append(float(row[1]))
-                speeds['C[1]'].append(float(row[2]))
-                speeds['H[2]'].append(float(row[3]))
-                speeds['H[3]'].append(float(row[4]))
+    for block in read_blocks(file_path):
+        if not block.speeds:  # block has no Speed[A/fs] row
+            continue
+        speeds['C[0]'].append(block.speeds[0])
+        speeds['C[1]'].append(block.speeds[1])
+        speeds['H[2]'].append(block.speeds[2])
+        speeds['H[3]'].append(block.speeds[3])
     return speeds
 
 # Read speeds from both quantum and classical CSV files
@@ -1,7 +1,9 @@
-import csv
+# Run from the repository root: python -m speed_distribution.speed_distribution
 import matplotlib.pyplot as plt
 import matplotlib as mpl
 
+from histograms_stats_molecule_formation.molecule_formation_reader import read_blocks
+
 class AtomSpeedPlotter:
     def __init__(self, num_carbons, num_hydrogens, classical_file, quantum_file, output_file):
         self.num_carbons = num_carbons
@@ -35,12 +37,11 @@ class AtomSpeedPlotter:
     # Read speeds from a CSV file
     def read_speeds(self, file_path):
         speeds = {label: [] for label in self.atom_labels}
-        with open(file_path, 'r') as file:
-            reader = csv.reader(file)
-            for row in reader:
-                if 'Speed[A/fs]' in row:
-                    for i, label in enumerate(self.atom_labels):
-                        speeds[label].append(float(row[i + 1]))  # Start from the second column for speeds
+        for block in read_blocks(file_path):
+            if not block.speeds:  # block has no Speed[A/fs] row
+                continue
+            for i, label in enumerate(self.atom_labels):
+                speeds[label].append(block.speeds[i])
         return speeds
 
     # Format labels with subscripts
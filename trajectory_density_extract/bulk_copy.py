@@ -0,0 +1,82 @@
+# Bulk copying of trajectory and density outputs: kernel side copies (copy_file_range / sendfile) or hard links,
+# many files at once on a thread pool, and .bov headers rewritten to point at their copied .dat
+# Author: Samuel S. Taylor
+
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+COPY_CHUNK_BYTES = 1 << 30  # bytes per copy_file_range / sendfile call
+
+
+def _kernel_copy(infile, outfile, size):
+    # Copies size bytes between two open files inside the kernel, without passing the data through Python
+    copy_range = getattr(os, 'copy_file_range', None)
+    offset = 0
+    while offset < size:
+        count = min(COPY_CHUNK_BYTES, size - offset)
+        if copy_range is not None:
+            copied = copy_range(infile.fileno(), outfile.fileno(), count, offset, offset)
+        else:
+            copied = os.sendfile(outfile.fileno(), infile.fileno(), offset, count)
+        if copied == 0:
+            break
+        offset += copied
+    return offset
+
+
+def copy_file(input_file, output_file, link=False):
+    """
+    Copies input_file to output_file. With link=True the output is a hard link when both are on the same filesystem
+    (no data is written at all), otherwise, and whenever linking fails, the bytes are copied in the kernel, with a
+    plain buffered copy as the last fallback. Returns 'link' or 'copy'.
+    """
+    if os.path.exists(output_file):
+        os.remove(output_file)  # also breaks an old hard link instead of writing through it into the source
+    if link:
+        try:
+            os.link(input_file, output_file)
+            return 'link'
+        except OSError:
+            pass  # other filesystem or no hard link support, copy instead
+
+    size = os.path.getsize(input_file)
+    with open(input_file, 'rb') as infile, open(output_file, 'wb') as outfile:
+        try:
+            copied = _kernel_copy(infile, outfile, size)
+        except (AttributeError, OSError):
+            copied = 0
+        if copied < size:
+            infile.seek(copied)
+            outfile.seek(copied)
+            shutil.copyfileobj(infile, outfile)
+    return 'copy'
+
+
+def rewrite_bov(bov_input_file, bov_output_file, data_file):
+    # Copies a .bov header with only its DATA_FILE: line changed to data_file
+    with open(bov_input_file, 'r') as infile:
+        lines = infile.readlines()
+    for i, line in enumerate(lines):
+        if line.lstrip().startswith("DATA_FILE:"):
+            lines[i] = line[:len(line) - len(line.lstrip())] + "DATA_FILE: " + data_file + "\n"
+            break
+    with open(bov_output_file, 'w') as outfile:
+        outfile.writelines(lines)
+
+
+def copy_density(dat_input_file, bov_input_file, dat_output_file, bov_output_file, link=False):
+    # One density time step: the .dat grid copied (or linked) as is, the .bov rewritten to point at the copy
+    copy_file(dat_input_file, dat_output_file, link=link)
+    rewrite_bov(bov_input_file, bov_output_file, os.path.basename(dat_output_file))
+
+
+def harvest(jobs, max_workers=None):
+    """
+    Runs every job on a thread pool. A job is (function, args), e.g. (copy_file, (input, output, True)) or
+    (copy_density, (dat_in, bov_in, dat_out, bov_out)). The copies mostly wait on the disk, so threads overlap them.
+    Returns the results in the order of jobs and re-raises the first error.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(function, *args) for function, args in jobs]
+        return [future.result() for future in futures]
@@ -1,19 +1,25 @@
+# Writes the last frame of every run's trajectory.xyz to its own file, reading only the end of each trajectory
+# Run from the repository root: python -m trajectory_screenshots_mogli.traj_extract_last_frame
+import os
+
+from trajectory_xyz.last_frame import extract_last_frame, extract_last_frames
+
+
 def filter_last_time_step(input_file, output_file):
-    with open(input_file, 'r') as infile:
-        lines = infile.readlines()
-
-    # Find the start index of the last time step
-    start_index = 0
-    for i, line in enumerate(lines):
-        if line.startswith(" # iter"):
-            start_index = i + 1
-
-    # Write the last time step data to the output file
-    with open(output_file, 'w') as outfile:
-        outfile.writelines(lines[start_index-2:])
-
-# Example usage
-for i in range(3):
-    input_filename = f"C4H10/kinked/pulse_7_5r{i+1}/trajectory.xyz"
-    output_filename = f"C4H10/kinked/lframe_traj/lframe_traj_r{i+1}.xyz"
-    filter_last_time_step(input_filename, output_filename)
+    extract_last_frame(input_file, output_file)
+
+
+def main():
+    num_runs = 3
+    input_path_form = "C4H10/kinked/pulse_7_5r{}/trajectory.xyz"
+    output_path_form = "C4H10/kinked/lframe_traj/lframe_traj_r{}.xyz"
+
+    file_pairs = [(input_path_form.format(i + 1), output_path_form.format(i + 1)) for i in range(num_runs)]
+    for _, output_filename in file_pairs:
+        os.makedirs(os.path.dirname(output_filename), exist_ok=True)
+    extract_last_frames(file_pairs)
+    print("Extracted the last frame of", len(file_pairs), "runs")
+
+
+if __name__ == '__main__':
+    main()
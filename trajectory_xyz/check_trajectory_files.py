@@ -0,0 +1,113 @@
+# Regression check of the trajectory_xyz readers on a shipped trajectory whose long-run frame headers overflow the
+# time field (" # iter =100000  time[fs]=********"), compared with a plain line-by-line parse, and of the fragment
+# tracker on a synthetic H2 that dissociates and forms again
+# Run from the repository root: python -m trajectory_xyz.check_trajectory_files
+# Author: Samuel S. Taylor
+
+import os
+import re
+import tempfile
+import numpy as np
+
+from trajectory_xyz.trajectory_reader import TrajectoryReader
+from trajectory_xyz.last_frame import last_iteration, extract_last_frame
+from trajectory_xyz.trajectory_cache import convert_trajectory, load_trajectory, positions_path, meta_path
+from trajectory_xyz.fragment_tracker import FragmentTracker
+
+CHECK_FILE = 'k_energy_v_time/trajectory_files/excitation-angle30-2-x3y1/trajectory.xyz'
+ITERATION_PATTERN = re.compile(r"# iter =\s*(\d+)")
+
+
+def reference_parse(filepath):
+    # (iterations, (frames x atoms x 3) positions) with the regex the scripts used before the shared readers
+    with open(filepath, 'r') as file:
+        lines = file.readlines()
+    num_atoms = int(lines[0])
+    iterations = []
+    positions = []
+    for i, line in enumerate(lines):
+        match = ITERATION_PATTERN.search(line)
+        if match and i + num_atoms < len(lines):
+            iterations.append(int(match.group(1)))
+            positions.append([[float(value) for value in row.split()[1:4]] for row in lines[i + 1:i + 1 + num_atoms]])
+    return np.array(iterations), np.array(positions)
+
+
+def check(name, passed):
+    print(f"  {'ok    ' if passed else 'FAILED'} {name}")
+    return passed
+
+
+def check_reader(filepath, iterations, positions):
+    reader = TrajectoryReader(filepath, use_cache=False)
+    reader_iterations, reader_times, reader_positions = reader.read_positions()
+    overflowed = np.isnan(reader_times)
+    return all([
+        check("TrajectoryReader iterations", np.array_equal(reader_iterations, iterations)),
+        check("TrajectoryReader positions", np.array_equal(reader_positions, positions)),
+        check(f"TrajectoryReader times ({overflowed.sum()} overflowed headers read as NaN)",
+              overflowed.any() and np.allclose(reader_times[~overflowed], iterations[~overflowed] / 1000)),
+    ])
+
+
+def check_cache(filepath, iterations, positions):
+    # Converts into a fresh cache, then checks what load_trajectory maps
+    for path in (positions_path(filepath), meta_path(filepath)):
+        if os.path.exists(path):
+            os.remove(path)
+    convert_trajectory(filepath)
+    trajectory = load_trajectory(filepath)
+    return all([
+        check("load_trajectory iterations", np.array_equal(trajectory.iterations, iterations)),
+        check("load_trajectory positions", np.array_equal(trajectory.positions, positions)),
+        check("load_trajectory times", np.isnan(trajectory.times).any()),
+    ])
+
+
+def check_last_frame(filepath, iterations):
+    # last_iteration and extract_last_frame against the baseline "keep everything from the last header on" copy
+    with open(filepath, 'r') as file:
+        lines = file.readlines()
+    start = max(i for i, line in enumerate(lines) if line.startswith(" # iter")) - 1
+    with tempfile.TemporaryDirectory() as directory:
+        output_file = os.path.join(directory, 'last_frame.xyz')
+        extract_last_frame(filepath, output_file)
+        with open(output_file, 'r') as file:
+            last_frame = file.read()
+    return all([
+        check(f"last_iteration ({iterations[-1]})", last_iteration(filepath) == iterations[-1]),
+        check("extract_last_frame", last_frame == ''.join(lines[start:])),
+    ])
+
+
+def check_fragment_tracker():
+    # H2 bonded at iterations 0-1, apart at 2-3, bonded again at 4: the break and the form frames both need a snapshot
+    separations = [0.74, 0.74, 3.0, 3.0, 0.74]
+    tracker = FragmentTracker(['H', 'H'])
+    for iteration, separation in enumerate(separations):
+        tracker.update(iteration, iteration / 1000, np.array([[0.0, 0.0, 0.0], [separation, 0.0, 0.0]]))
+    events, snapshots = tracker.finish()
+    return all([
+        check("FragmentTracker snapshots at iterations 0, 2, 4",
+              [snapshot.iteration for snapshot in snapshots] == [0, 2, 4]),
+        check("FragmentTracker split snapshot holds two fragments", len(snapshots[1].fragments) == 2),
+        check("FragmentTracker break / form events changed the fragments",
+              [(event.iteration, event.kind, event.changed) for event in events] == [(2, 'break', True),
+                                                                                     (4, 'form', True)]),
+    ])
+
+
+def main():
+    print("-= TRAJECTORY READER CHECK =-", CHECK_FILE)
+    iterations, positions = reference_parse(CHECK_FILE)
+    passed = check_reader(CHECK_FILE, iterations, positions)
+    passed = check_cache(CHECK_FILE, iterations, positions) and passed
+    passed = check_last_frame(CHECK_FILE, iterations) and passed
+    passed = check_fragment_tracker() and passed
+    if not passed:
+        raise ValueError(f"trajectory_xyz checks failed on {CHECK_FILE} or the synthetic H2 trajectory")
+    print("All checks passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# Interatomic distances of every frame as one (frames x pairs) array in condensed (scipy pdist) pair order,
+# computed a chunk of frames at a time, with helpers to pick out the bond lengths of an element pair
+# Author: Samuel S. Taylor
+
+import numpy as np
+
+CHUNK_BYTES = 1 << 26  # 64 MB of pair difference vectors per chunk of frames
+
+
+def atom_pairs(num_atoms):
+    # (pairs x 2) atom index pairs i < j in pdist order: (0, 1), (0, 2), ..., (1, 2), ...
+    return np.stack(np.triu_indices(num_atoms, k=1), axis=1)
+
+
+def pair_column(num_atoms, a, b):
+    # Column of the atom pair (a, b) in a condensed distance array
+    a, b = min(a, b), max(a, b)
+    if a == b or not 0 <= a < b < num_atoms:
+        raise ValueError(f"({a}, {b}) is not a pair of distinct atoms out of {num_atoms}")
+    return num_atoms * a - a * (a + 1) // 2 + (b - a - 1)
+
+
+def distance_series(positions, pairs=None, chunk_frames=None):
+    """
+    Distances between atom pairs in every frame of (frames x atoms x 3) positions, e.g. the memory-mapped
+    TrajectoryArrays.positions. pairs is (pairs x 2) and defaults to all pairs in pdist order, giving the condensed
+    distance matrix of every frame as a row. Frames are processed chunk_frames at a time (by default as many as fit in
+    CHUNK_BYTES), so only one chunk of positions and difference vectors is in memory besides the result.
+    """
+    num_frames, num_atoms = positions.shape[:2]
+    pairs = atom_pairs(num_atoms) if pairs is None else np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    if chunk_frames is None:
+        chunk_frames = max(1, CHUNK_BYTES // max(1, len(pairs) * 3 * 8))
+
+    distances = np.empty((num_frames, len(pairs)))
+    for start in range(0, num_frames, chunk_frames):
+        chunk = np.asarray(positions[start:start + chunk_frames], dtype=np.float64)
+        differences = chunk[:, pairs[:, 0]] - chunk[:, pairs[:, 1]]
+        distances[start:start + chunk_frames] = np.sqrt(np.einsum('fpk,fpk->fp', differences, differences))
+    return distances
+
+
+def element_pair_columns(symbols, element_a, element_b):
+    """
+    Columns of the condensed distance array whose pair is one element_a and one element_b atom (either order), and
+    the (pairs x 2) atom pairs they belong to.
+    """
+    symbols = np.asarray(symbols, dtype=str)
+    pairs = atom_pairs(len(symbols))
+    first, second = symbols[pairs[:, 0]], symbols[pairs[:, 1]]
+    match = ((first == element_a) & (second == element_b)) | ((first == element_b) & (second == element_a))
+    columns = np.flatnonzero(match)
+    return columns, pairs[columns]
+
+
+def bond_length_traces(distances, symbols, element_a, element_b):
+    """
+    {(a, b): distance over time} for every element_a - element_b atom pair of a condensed (frames x pairs) distance
+    array, e.g. bond_length_traces(distances, symbols, 'C', 'H') for all C-H distances.
+    """
+    columns, pairs = element_pair_columns(symbols, element_a, element_b)
+    return {(int(a), int(b)): distances[:, column] for column, (a, b) in zip(columns, pairs)}
+
+
+def nearest_partner_distance(distances, symbols, element_a, element_b):
+    """
+    (frames x element_a atoms) distance from every element_a atom to its closest element_b atom, e.g. for every
+    hydrogen the length of its C-H bond for as long as it has one. Returns (atoms, distances).
+    """
+    symbols = np.asarray(symbols, dtype=str)
+    atoms = np.flatnonzero(symbols == element_a)
+    columns, pairs = element_pair_columns(symbols, element_a, element_b)
+    nearest = np.full((len(distances), len(atoms)), np.inf)
+    for i, atom in enumerate(atoms):
+        own = np.flatnonzero((pairs == atom).any(axis=1))
+        if len(own):
+            nearest[:, i] = distances[:, columns[own]].min(axis=1)
+    return atoms, nearest
@@ -0,0 +1,124 @@
+# Fragment detection from atom positions alone: bonds from per element pair distance cutoffs (KD-tree neighbour
+# search), fragments as the connected components of the bond graph (union-find), no renderer needed
+# Author: Samuel S. Taylor
+
+from collections import namedtuple
+import numpy as np
+from scipy.spatial import cKDTree
+
+# Covalent radii in Angstrom. Two atoms are bonded when they are closer than BOND_SCALE * (r_a + r_b),
+# e.g. H-H 0.81, C-H 1.39, C-C 1.98 A
+COVALENT_RADII = {
+    'H': 0.31, 'He': 0.28,
+    'Li': 1.28, 'Be': 0.96, 'B': 0.84, 'C': 0.76, 'N': 0.71, 'O': 0.66, 'F': 0.57, 'Ne': 0.58,
+    'Na': 1.66, 'Mg': 1.41, 'Al': 1.21, 'Si': 1.11, 'P': 1.07, 'S': 1.05, 'Cl': 1.02, 'Ar': 1.06,
+}
+BOND_SCALE = 1.3
+
+# formula like moleculeFormations writes it (C first, then H, then the rest alphabetically) and the atom indices
+Fragment = namedtuple('Fragment', ['formula', 'atoms'])
+
+
+def cutoff_matrix(elements, scale=BOND_SCALE, cutoffs=None):
+    """
+    (elements x elements) bond cutoffs in Angstrom. cutoffs overrides single pairs, e.g. {('C', 'H'): 1.2}
+    (the order within a pair does not matter).
+    """
+    missing = [element for element in elements if element not in COVALENT_RADII]
+    if missing:
+        raise ValueError(f"No covalent radius for {missing}, add it to COVALENT_RADII or pass cutoffs")
+    radii = np.array([COVALENT_RADII[element] for element in elements])
+    matrix = scale * (radii[:, None] + radii[None, :])
+    index = {element: i for i, element in enumerate(elements)}
+    for (a, b), cutoff in (cutoffs or {}).items():
+        if a in index and b in index:
+            matrix[index[a], index[b]] = matrix[index[b], index[a]] = cutoff
+    return matrix
+
+
+def bonded_pairs(positions, element_codes, cutoffs):
+    """
+    (pairs x 2) atom index pairs (i < j) closer than their pair cutoff. The KD-tree only returns pairs within the
+    largest cutoff, which are then checked against their own cutoff.
+    """
+    tree = cKDTree(positions)
+    pairs = tree.query_pairs(cutoffs.max(), output_type='ndarray')
+    if len(pairs) == 0:
+        return pairs.reshape(0, 2)
+    distances = np.linalg.norm(positions[pairs[:, 0]] - positions[pairs[:, 1]], axis=1)
+    bonded = distances < cutoffs[element_codes[pairs[:, 0]], element_codes[pairs[:, 1]]]
+    return pairs[bonded]
+
+
+def union_find(num_nodes, pairs):
+    """
+    Connected components of the graph with the given edges. Returns the root of every node, the smallest node index
+    of its component. Array based union-find: every round each edge hooks the larger of its two roots onto the
+    smaller one, then the paths are compressed until every node points at its root.
+    """
+    parent = np.arange(num_nodes)
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    while len(pairs):
+        root_a, root_b = parent[pairs[:, 0]], parent[pairs[:, 1]]
+        unmerged = root_a != root_b
+        if not unmerged.any():
+            break
+        low = np.minimum(root_a, root_b)[unmerged]
+        high = np.maximum(root_a, root_b)[unmerged]
+        np.minimum.at(parent, high, low)
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+        pairs = pairs[unmerged]
+    return parent
+
+
+def fragment_formula(symbols):
+    # C first, then H, then the rest alphabetically, counts of 1 left out: ['H', 'C', 'H'] -> 'CH2'
+    counts = {}
+    for symbol in symbols:
+        counts[symbol] = counts.get(symbol, 0) + 1
+    order = [element for element in ('C', 'H') if element in counts]
+    order += sorted(element for element in counts if element not in ('C', 'H'))
+    return ''.join(element + (str(counts[element]) if counts[element] > 1 else '') for element in order)
+
+
+def fragment_labels(symbols, positions, scale=BOND_SCALE, cutoffs=None):
+    """
+    Fragment label of every atom in every frame from (frames x atoms x 3) positions (a single (atoms x 3) frame is
+    allowed too). Returns (frames x atoms) labels, each the smallest atom index of the atom's fragment in that frame,
+    and the bonded pairs of every frame. The bonds of all frames go through a single union-find.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    single_frame = positions.ndim == 2
+    if single_frame:
+        positions = positions[None]
+    num_frames, num_atoms = positions.shape[:2]
+    if len(symbols) != num_atoms:
+        raise ValueError(f"{len(symbols)} symbols for {num_atoms} atoms")
+
+    elements, element_codes = np.unique(np.asarray(symbols, dtype=str), return_inverse=True)
+    cutoffs = cutoff_matrix(elements.tolist(), scale, cutoffs)
+
+    frame_pairs = [bonded_pairs(frame, element_codes, cutoffs) for frame in positions]
+    all_pairs = np.concatenate([pairs + frame * num_atoms for frame, pairs in enumerate(frame_pairs)])
+    roots = union_find(num_frames * num_atoms, all_pairs).reshape(num_frames, num_atoms)
+    labels = roots - np.arange(num_frames)[:, None] * num_atoms
+    return (labels[0], frame_pairs[0]) if single_frame else (labels, frame_pairs)
+
+
+def fragments_from_labels(symbols, labels):
+    # Fragments of one frame, ordered by their smallest atom index
+    fragments = []
+    for root in np.unique(labels):
+        atoms = np.flatnonzero(labels == root)
+        fragments.append(Fragment(fragment_formula([symbols[atom] for atom in atoms]), atoms.tolist()))
+    return fragments
+
+
+def detect_fragments(symbols, positions, scale=BOND_SCALE, cutoffs=None):
+    # Fragments of a single (atoms x 3) frame
+    labels, _ = fragment_labels(symbols, positions, scale, cutoffs)
+    return fragments_from_labels(symbols, labels)
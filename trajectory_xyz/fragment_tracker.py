@@ -0,0 +1,151 @@
+# Time-resolved fragment tracking: one streaming pass over the trajectory frames that keeps the fragment
+# connectivity up to date incrementally and logs bond breaking / forming and the fragment centres of mass
+# Author: Samuel S. Taylor
+
+from collections import namedtuple
+import numpy as np
+from scipy.spatial.distance import pdist
+
+from trajectory_xyz.trajectory_reader import TrajectoryReader
+from trajectory_xyz.kinematics import masses_from_symbols
+from trajectory_xyz.fragment_detector import (BOND_SCALE, cutoff_matrix, bonded_pairs, union_find,
+                                              fragments_from_labels)
+
+# kind is 'break' or 'form', atoms the (a, b) atom pair (a < b) and distance their distance in that frame.
+# fragment_a / fragment_b are the formulas of the fragments holding a and b after the frame, changed is whether the
+# bond split / merged fragments (a broken bond in a ring changes nothing)
+BondEvent = namedtuple('BondEvent', ['iteration', 'time', 'kind', 'atoms', 'distance', 'fragment_a', 'fragment_b',
+                                     'changed'])
+
+# Fragments of one frame with their centres of mass (fragments x 3) and the condensed (pdist order) distances
+# between the centres
+FragmentSnapshot = namedtuple('FragmentSnapshot', ['iteration', 'time', 'fragments', 'centers', 'distances'])
+
+
+class FragmentTracker:
+    """
+    Follows the fragments of one trajectory frame by frame. The bonds of each frame are compared with those of the
+    previous one: new bonds are merged into the fragment labels with union-find, and when bonds break only the
+    fragments that lost a bond are rebuilt (split detection), the rest keep their labels. Every atom's label is the
+    smallest atom index of its fragment.
+    """
+
+    def __init__(self, symbols, masses=None, scale=BOND_SCALE, cutoffs=None, snapshot_every=None):
+        self.symbols = list(symbols)
+        self.masses = masses_from_symbols(self.symbols) if masses is None else np.asarray(masses, dtype=np.float64)
+        elements, self.element_codes = np.unique(np.asarray(self.symbols, dtype=str), return_inverse=True)
+        self.cutoffs = cutoff_matrix(elements.tolist(), scale, cutoffs)
+        self.snapshot_every = snapshot_every  # also snapshot every n-th frame, not only when the fragments change
+
+        self.labels = None
+        self.bonds = set()
+        self.num_frames = 0
+        self.last_frame = None  # (iteration, time, positions) of the latest frame
+        self.events = []
+        self.snapshots = []
+
+    def split_fragments(self, broken, pairs):
+        # Relabels only the fragments that held a broken bond, from the bonds they still have (in place)
+        affected = np.isin(self.labels, self.labels[[a for a, _ in broken]])
+        atoms = np.flatnonzero(affected)
+        local_index = np.full(len(self.labels), -1)
+        local_index[atoms] = np.arange(len(atoms))
+        inside = affected[pairs[:, 0]] & affected[pairs[:, 1]]
+        roots = union_find(len(atoms), local_index[pairs[inside]])
+        self.labels[atoms] = atoms[roots]
+
+    def merge_fragments(self, formed):
+        # Union of the fragments joined by new bonds, done on the labels (the fragment roots)
+        label_pairs = self.labels[np.array(sorted(formed))]
+        roots = union_find(len(self.labels), label_pairs)
+        self.labels = roots[self.labels]
+
+    def update(self, iteration, time, positions):
+        """
+        Processes the next frame and returns the bond events it produced. positions is (atoms x 3).
+        """
+        positions = np.asarray(positions, dtype=np.float64)
+        pairs = bonded_pairs(positions, self.element_codes, self.cutoffs)
+        bonds = set(map(tuple, pairs.tolist()))
+        # A copy, split_fragments relabels in place
+        previous_labels = None if self.labels is None else self.labels.copy()
+
+        if self.labels is None:
+            self.labels = union_find(len(self.symbols), pairs)
+            formed, broken = set(), set()
+        else:
+            formed, broken = bonds - self.bonds, self.bonds - bonds
+            if broken:
+                self.split_fragments(broken, pairs)
+            if formed:
+                self.merge_fragments(formed)
+        self.bonds = bonds
+
+        events = []
+        if formed or broken:
+            formulas = {fragment.atoms[0]: fragment.formula
+                        for fragment in fragments_from_labels(self.symbols, self.labels)}
+            for kind, changes in (('break', broken), ('form', formed)):
+                for a, b in sorted(changes):
+                    changed = (self.labels[a] != self.labels[b]) if kind == 'break' else \
+                        (previous_labels[a] != previous_labels[b])
+                    distance = np.linalg.norm(positions[a] - positions[b])
+                    events.append(BondEvent(iteration, time, kind, (a, b), distance, formulas[self.labels[a]],
+                                            formulas[self.labels[b]], bool(changed)))
+            self.events.extend(events)
+
+        fragments_changed = previous_labels is None or not np.array_equal(previous_labels, self.labels)
+        periodic = self.snapshot_every and self.num_frames % self.snapshot_every == 0
+        if fragments_changed or periodic:
+            self.snapshots.append(self.snapshot(iteration, time, positions))
+        self.num_frames += 1
+        self.last_frame = (iteration, time, positions)
+        return events
+
+    def snapshot(self, iteration, time, positions):
+        fragments = fragments_from_labels(self.symbols, self.labels)
+        centers = np.array([np.average(positions[fragment.atoms], axis=0, weights=self.masses[fragment.atoms])
+                            for fragment in fragments])
+        return FragmentSnapshot(iteration, time, fragments, centers, pdist(centers))
+
+    def finish(self):
+        # Snapshot of the last frame (if it is not already the last snapshot), returns (events, snapshots)
+        if self.num_frames and self.snapshots[-1].iteration != self.last_frame[0]:
+            self.snapshots.append(self.snapshot(*self.last_frame))
+        return self.events, self.snapshots
+
+
+def track_fragments(filepath, step=1, masses=None, scale=BOND_SCALE, cutoffs=None, snapshot_every=None):
+    # One streaming pass over every step-th frame of a trajectory.xyz file, returns (events, snapshots)
+    reader = TrajectoryReader(filepath)
+    tracker = FragmentTracker(reader.symbols(), masses, scale, cutoffs, snapshot_every)
+    for frame in reader.frames(step=step):
+        tracker.update(frame.iteration, frame.time, frame.positions)
+    return tracker.finish()
+
+
+def write_event_log(output_prefix, events, snapshots):
+    """
+    Writes <prefix>_bond_events.csv (one line per bond event), <prefix>_fragments.csv (fragments and centres of mass
+    of every snapshot) and <prefix>_fragment_distances.csv (distances between the centres of mass of every snapshot).
+    """
+    with open(output_prefix + '_bond_events.csv', 'w') as file:
+        file.write("iteration, time[fs], event, atom_a, atom_b, distance[A], fragment_a, fragment_b, changed\n")
+        for event in events:
+            file.write(f"{event.iteration}, {event.time}, {event.kind}, {event.atoms[0]}, {event.atoms[1]}, "
+                       f"{event.distance:.6f}, {event.fragment_a}, {event.fragment_b}, {int(event.changed)}\n")
+
+    with open(output_prefix + '_fragments.csv', 'w') as fragments_file, \
+            open(output_prefix + '_fragment_distances.csv', 'w') as distances_file:
+        fragments_file.write("iteration, time[fs], fragment, atoms, com_x[A], com_y[A], com_z[A]\n")
+        distances_file.write("iteration, time[fs], fragment_a, fragment_b, distance[A]\n")
+        for snapshot in snapshots:
+            names = [f"{fragment.formula}{''.join(f'[{atom}]' for atom in fragment.atoms)}"
+                     for fragment in snapshot.fragments]
+            for name, fragment, center in zip(names, snapshot.fragments, snapshot.centers):
+                fragments_file.write(f"{snapshot.iteration}, {snapshot.time}, {fragment.formula}, {name}, "
+                                     f"{center[0]:.6f}, {center[1]:.6f}, {center[2]:.6f}\n")
+            first, second = np.triu_indices(len(names), k=1)
+            for a, b, distance in zip(first, second, snapshot.distances):
+                distances_file.write(f"{snapshot.iteration}, {snapshot.time}, {names[a]}, {names[b]}, "
+                                     f"{distance:.6f}\n")
@@ -0,0 +1,74 @@
+# Velocities, accelerations, forces and kinetic energies of every atom of a trajectory at once, from the
+# (frames x atoms x 3) position array, with central differences that allow non-uniform timesteps
+# Author: Samuel S. Taylor
+
+from collections import namedtuple
+import numpy as np
+from scipy.signal import savgol_filter
+
+# Atomic mass unit in eV_fs^2/A^2 and the mass numbers the kinematics and KE scripts use as masses
+ATOMIC_MASS_UNIT = 1.66053886 / 1.602176487e-2
+MASS_NUMBERS = {'H': 1, 'C': 12, 'N': 14, 'O': 16}
+
+# time is (frames), positions / velocities / accelerations / forces are (frames x atoms x 3) in A, A/fs, A/fs^2 and
+# eV/A, speeds and kinetic_energies (eV) are (frames x atoms)
+Kinematics = namedtuple('Kinematics', ['time', 'positions', 'velocities', 'speeds', 'accelerations', 'forces',
+                                       'kinetic_energies'])
+
+
+def masses_from_symbols(symbols):
+    # Mass of every atom in eV_fs^2/A^2
+    try:
+        return np.array([MASS_NUMBERS[symbol] for symbol in symbols]) * ATOMIC_MASS_UNIT
+    except KeyError as e:
+        raise ValueError(f"No mass for element {e.args[0]}, add it to MASS_NUMBERS")
+
+
+def time_derivative(values, time):
+    """
+    d(values)/dt along the first (frame) axis for any trailing shape. Second order central differences on the
+    interior and second order one-sided differences at both ends, weighted for the actual spacing between frames, so
+    uneven timesteps (e.g. sampled or restarted trajectories) are handled.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    time = np.asarray(time, dtype=np.float64)
+    if len(time) != len(values):
+        raise ValueError(f"{len(time)} times for {len(values)} frames")
+    if len(time) < 3:
+        raise ValueError("At least 3 frames are needed for second order differences")
+    if np.any(np.diff(time) <= 0):
+        raise ValueError("Times must be strictly increasing")
+    return np.gradient(values, time, axis=0, edge_order=2)
+
+
+def smooth_positions(positions, window, polyorder=3):
+    # Savitzky-Golay filter along the frame axis (the window counts frames, so it assumes roughly even timesteps)
+    if window % 2 == 0 or window <= polyorder:
+        raise ValueError(f"The smoothing window must be odd and larger than polyorder ({polyorder}), got {window}")
+    return savgol_filter(positions, window, polyorder, axis=0, mode='interp')
+
+
+def compute_kinematics(positions, time, masses, smooth_window=None, polyorder=3):
+    """
+    Kinematics of all atoms from (frames x atoms x 3) positions (e.g. TrajectoryArrays.positions), the time of every
+    frame in fs and the mass of every atom in eV_fs^2/A^2. Velocities are the time derivative of the positions and
+    accelerations that of the velocity vectors. smooth_window (odd, in frames) applies a Savitzky-Golay filter to the
+    positions first.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    masses = np.asarray(masses, dtype=np.float64)
+    if positions.ndim != 3 or positions.shape[2] != 3:
+        raise ValueError(f"Positions must be (frames x atoms x 3), got {positions.shape}")
+    if len(masses) != positions.shape[1]:
+        raise ValueError(f"{len(masses)} masses for {positions.shape[1]} atoms")
+
+    if smooth_window:
+        positions = smooth_positions(positions, smooth_window, polyorder)
+    velocities = time_derivative(positions, time)
+    accelerations = time_derivative(velocities, time)
+
+    speeds = np.linalg.norm(velocities, axis=2)
+    forces = accelerations * masses[None, :, None]
+    kinetic_energies = 0.5 * masses[None, :] * speeds ** 2
+    return Kinematics(np.asarray(time, dtype=np.float64), positions, velocities, speeds, accelerations, forces,
+                      kinetic_energies)
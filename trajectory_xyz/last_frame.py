@@ -0,0 +1,62 @@
+# Last frame of trajectory.xyz files found by reading backwards from the end of the file, so only the tail is read
+# no matter how long the trajectory is
+# Author: Samuel S. Taylor
+
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from trajectory_xyz.trajectory_reader import parse_frame_header
+
+REVERSE_BLOCK_BYTES = 1 << 16  # 64 KB per backwards read
+HEADER_PREFIX = b'\n # iter'
+
+
+def find_last_frame(filepath, block_bytes=REVERSE_BLOCK_BYTES):
+    """
+    Byte offset of the last frame (its atom count line) and that frame's comment line, found by reading the file
+    backwards in blocks until the last " # iter" line and the line before it are both in the buffer.
+    """
+    with open(filepath, 'rb') as file:
+        position = file.seek(0, os.SEEK_END)
+        buffer = b''
+        while True:
+            read_size = min(block_bytes, position)
+            position -= read_size
+            file.seek(position)
+            buffer = file.read(read_size) + buffer
+
+            header = buffer.rfind(HEADER_PREFIX)
+            if header >= 0:
+                count_line = buffer.rfind(b'\n', 0, header)
+                if count_line >= 0 or position == 0:
+                    header_end = buffer.find(b'\n', header + 1)
+                    header_line = buffer[header + 1:header_end if header_end >= 0 else len(buffer)].decode()
+                    return position + count_line + 1, header_line
+            if position == 0:
+                raise ValueError(f"No ' # iter' frame header in {filepath}")
+
+
+def last_iteration(filepath):
+    # Iteration number of the last frame (parse_frame_header also reads overflowed time[fs]=******** headers)
+    _, header_line = find_last_frame(filepath)
+    return parse_frame_header(header_line)[0]
+
+
+def extract_last_frame(input_file, output_file):
+    # Copies the last frame (from its atom count line to the end of the file) to output_file
+    start, _ = find_last_frame(input_file)
+    with open(input_file, 'rb') as infile, open(output_file, 'wb') as outfile:
+        infile.seek(start)
+        shutil.copyfileobj(infile, outfile)
+
+
+def extract_last_frames(file_pairs, max_workers=None):
+    """
+    Runs extract_last_frame for every (input_file, output_file) pair on a thread pool. The work is file I/O, so
+    threads overlap the reads of different runs. Returns the output files in the order given.
+    """
+    file_pairs = list(file_pairs)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(lambda pair: extract_last_frame(*pair), file_pairs))
+    return [output_file for _, output_file in file_pairs]
@@ -0,0 +1,114 @@
+# Binary cache of trajectory.xyz files: a memory-mapped (frames x atoms x 3) position array plus the iterations,
+# times and atom symbols, so analysis scripts skip the text parsing after the first run
+# Author: Samuel S. Taylor
+
+import os
+from collections import namedtuple
+import numpy as np
+
+from trajectory_xyz.trajectory_reader import TrajectoryReader, parse_frame_header
+
+POSITIONS_SUFFIX = '.positions.npy'
+META_SUFFIX = '.meta.npz'
+CONVERT_CHUNK_FRAMES = 256  # frames parsed per read while converting
+
+# positions is a read-only (frames x atoms x 3) memmap, the others are ordinary arrays (symbols has one entry per atom)
+TrajectoryArrays = namedtuple('TrajectoryArrays', ['iterations', 'times', 'symbols', 'positions'])
+
+
+def positions_path(filepath):
+    return filepath + POSITIONS_SUFFIX
+
+
+def meta_path(filepath):
+    return filepath + META_SUFFIX
+
+
+def parse_frames_text(text, num_atoms):
+    """
+    Parses the text of consecutive whole frames at once: every atom line of every frame is split in one go and
+    converted in a single array cast, instead of float() per coordinate. Returns (iterations, times, symbols of the
+    first frame, (frames x atoms x 3) positions).
+    """
+    lines = text.splitlines()
+    lines_per_frame = num_atoms + 2
+    num_frames = len(lines) // lines_per_frame
+    frame_lines = np.array(lines[:num_frames * lines_per_frame], dtype=object).reshape(num_frames, lines_per_frame)
+
+    headers = [parse_frame_header(line) for line in frame_lines[:, 1]]
+    iterations = np.array([iteration for iteration, _ in headers], dtype=np.int64)
+    times = np.array([time for _, time in headers], dtype=np.float64)
+
+    tokens = np.array(' '.join(frame_lines[:, 2:].ravel()).split(), dtype=object).reshape(num_frames, num_atoms, 4)
+    symbols = tokens[0, :, 0].astype(str) if num_frames else np.zeros(0, dtype=str)
+    positions = tokens[:, :, 1:].astype(np.float64)
+    return iterations, times, symbols, positions
+
+
+def convert_trajectory(filepath, dtype=np.float64, chunk_frames=CONVERT_CHUNK_FRAMES):
+    """
+    Converts trajectory.xyz into <file>.positions.npy (written chunk by chunk into a memmap, so the whole
+    trajectory never has to fit in memory) and <file>.meta.npz with the iterations, times, symbols and the size /
+    modification time of the source it was made from.
+    """
+    file_size = os.path.getsize(filepath)
+    mtime = os.path.getmtime(filepath)
+    reader = TrajectoryReader(filepath)
+    num_frames, num_atoms = len(reader), reader.num_atoms
+
+    temp_positions_path = positions_path(filepath) + '.tmp'
+    positions = np.lib.format.open_memmap(temp_positions_path, mode='w+', dtype=dtype,
+                                          shape=(num_frames, num_atoms, 3))
+    iterations = np.zeros(num_frames, dtype=np.int64)
+    times = np.zeros(num_frames)
+    symbols = np.zeros(num_atoms, dtype=str)
+
+    with open(filepath, 'rb') as file:
+        for start in range(0, num_frames, chunk_frames):
+            stop = min(start + chunk_frames, num_frames)
+            file.seek(int(reader.offsets[start]))
+            text = file.read(int(reader.offsets[stop] - reader.offsets[start])).decode()
+            iterations[start:stop], times[start:stop], chunk_symbols, positions[start:stop] = \
+                parse_frames_text(text, num_atoms)
+            if start == 0:
+                symbols = chunk_symbols
+    positions.flush()
+    del positions
+
+    temp_meta_path = meta_path(filepath) + '.tmp.npz'
+    np.savez(temp_meta_path, iterations=iterations, times=times, symbols=symbols, source_size=file_size,
+             source_mtime=mtime, dtype=np.dtype(dtype).str)
+    os.replace(temp_positions_path, positions_path(filepath))
+    os.replace(temp_meta_path, meta_path(filepath))
+
+
+def read_meta(filepath):
+    path = meta_path(filepath)
+    if not os.path.exists(path) or not os.path.exists(positions_path(filepath)):
+        return None
+    try:
+        with np.load(path) as data:
+            return {key: data[key] for key in data.files}
+    except (OSError, ValueError):
+        return None
+
+
+def cache_is_current(meta, filepath, dtype):
+    return (meta is not None
+            and int(meta['source_size']) == os.path.getsize(filepath)
+            and float(meta['source_mtime']) == os.path.getmtime(filepath)
+            and str(meta['dtype']) == np.dtype(dtype).str)
+
+
+def load_trajectory(filepath, dtype=np.float64):
+    """
+    Opens the binary cache of a trajectory.xyz file, converting it first if there is no cache yet, it was made with
+    another dtype (float32 halves the size), or the .xyz changed since. Positions are memory-mapped, so slicing
+    (e.g. positions[::10, atoms]) only reads the frames that are used.
+    """
+    meta = read_meta(filepath)
+    if not cache_is_current(meta, filepath, dtype):
+        convert_trajectory(filepath, dtype=dtype)
+        meta = read_meta(filepath)
+    positions = np.load(positions_path(filepath), mmap_mode='r')
+    return TrajectoryArrays(meta['iterations'], meta['times'], meta['symbols'].tolist(), positions)
@@ -0,0 +1,214 @@
+# Random-access reader for trajectory.xyz files through a cached index of frame byte offsets
+# Author: Samuel S. Taylor
+
+import os
+from collections import namedtuple
+import numpy as np
+
+INDEX_SUFFIX = '.frames.npz'
+SCAN_CHUNK_BYTES = 1 << 24  # 16 MB per read while indexing
+
+# One trajectory frame: iteration and time[fs] from the comment line (time is NaN when the line has none),
+# the element symbols and the (atoms x 3) positions in Angstrom
+Frame = namedtuple('Frame', ['iteration', 'time', 'symbols', 'positions'])
+
+
+def index_path(filepath):
+    return filepath + INDEX_SUFFIX
+
+
+def parse_frame_header(line):
+    # " # iter =   500  time[fs]= 0.50000" -> (500, 0.5). Long runs overflow the Fortran time field
+    # (" # iter =100000  time[fs]=********"), the time is NaN then, the iteration is always readable
+    parts = line.split('=')
+    if len(parts) < 2:
+        raise ValueError(f"Not a trajectory frame comment line: '{line.strip()}'")
+    iteration = int(parts[1].split()[0])
+    try:
+        time = float(parts[2])
+    except (IndexError, ValueError):
+        time = np.nan
+    return iteration, time
+
+
+def scan_line_starts(file, start_offset, file_size):
+    """
+    Byte offsets of every line that starts at or after start_offset (start_offset itself included) followed by the
+    end of the last line, found with NumPy over large binary chunks instead of Python line iteration.
+    """
+    starts = [np.array([start_offset], dtype=np.int64)]
+    file.seek(start_offset)
+    position = start_offset
+    while position < file_size:
+        chunk = file.read(min(SCAN_CHUNK_BYTES, file_size - position))
+        if not chunk:
+            break
+        newlines = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == ord('\n'))
+        starts.append(newlines.astype(np.int64) + position + 1)
+        position += len(chunk)
+    line_starts = np.concatenate(starts)
+    if line_starts[-1] < file_size:
+        line_starts = np.append(line_starts, file_size)  # last line has no newline
+    return line_starts
+
+
+class TrajectoryReader:
+    """
+    Indexes a trajectory.xyz file once (the byte offset of every frame, cached next to the file as
+    <file>.frames.npz) and then reads any frame, range of frames or every k-th frame by seeking straight to it,
+    without loading the whole file. The index is rebuilt when the file changes; when the file only grew (a running
+    simulation) only the new part is scanned, starting again at the last indexed frame in case it was still being
+    written.
+    """
+
+    def __init__(self, filepath, use_cache=True):
+        self.filepath = filepath
+        self.use_cache = use_cache
+        self.num_atoms = 0
+        self.offsets = np.zeros(1, dtype=np.int64)  # start of every frame, plus the end of the last complete frame
+        self.load_index()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return list(self.frames(item.start, item.stop, item.step))
+        return self.frame(item)
+
+    def __iter__(self):
+        return self.frames()
+
+    @property
+    def lines_per_frame(self):
+        return self.num_atoms + 2
+
+    def load_index(self):
+        file_size = os.path.getsize(self.filepath)
+        mtime = os.path.getmtime(self.filepath)
+
+        cached = self.read_cached_index() if self.use_cache else None
+        if cached is not None and cached['file_size'] == file_size and cached['mtime'] == mtime:
+            self.num_atoms = int(cached['num_atoms'])
+            self.offsets = cached['offsets']
+            return
+
+        resume = (cached is not None and file_size > cached['file_size'] and len(cached['offsets']) > 1
+                  and self.frame_starts_match(cached))
+        if resume:
+            self.num_atoms = int(cached['num_atoms'])
+            self.build_index(file_size, previous_offsets=cached['offsets'])
+        else:
+            self.build_index(file_size)
+
+        if self.use_cache:
+            self.write_index(file_size, mtime)
+
+    def read_cached_index(self):
+        path = index_path(self.filepath)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                return {key: data[key] for key in data.files}
+        except (OSError, ValueError):
+            return None
+
+    def frame_starts_match(self, cached):
+        # The file only grew if the old last frame still starts where the index says (checked on its header line)
+        with open(self.filepath, 'rb') as file:
+            file.seek(int(cached['offsets'][-2]))
+            return file.readline().strip() == str(int(cached['num_atoms'])).encode()
+
+    def build_index(self, file_size, previous_offsets=None):
+        with open(self.filepath, 'rb') as file:
+            if previous_offsets is None:
+                first_line = file.readline()
+                try:
+                    self.num_atoms = int(first_line.strip())
+                except ValueError:
+                    raise ValueError(f"{self.filepath} does not start with an atom count line")
+                kept_offsets = np.zeros(0, dtype=np.int64)
+                scan_start = 0
+            else:
+                # Scan again from the last indexed frame in case it was still being written
+                kept_offsets = previous_offsets[:-2]
+                scan_start = int(previous_offsets[-2])
+
+            # Frame starts are every lines_per_frame-th line start. Only complete frames are indexed, so the last
+            # offset is the end of the last complete frame
+            line_starts = scan_line_starts(file, scan_start, file_size)
+            num_frames = (len(line_starts) - 1) // self.lines_per_frame
+            new_offsets = line_starts[:num_frames * self.lines_per_frame + 1:self.lines_per_frame]
+        self.offsets = np.concatenate([kept_offsets, new_offsets]).astype(np.int64)
+
+    def write_index(self, file_size, mtime):
+        path = index_path(self.filepath)
+        temp_path = path + '.tmp.npz'
+        np.savez(temp_path, file_size=file_size, mtime=mtime, num_atoms=self.num_atoms, offsets=self.offsets)
+        os.replace(temp_path, path)
+
+    def _frame_index(self, index):
+        num_frames = len(self)
+        if index < 0:
+            index += num_frames
+        if not 0 <= index < num_frames:
+            raise IndexError(f"Frame {index} out of range for {num_frames} frames")
+        return index
+
+    def read_frame_text(self, index):
+        index = self._frame_index(index)
+        with open(self.filepath, 'rb') as file:
+            file.seek(int(self.offsets[index]))
+            return file.read(int(self.offsets[index + 1] - self.offsets[index])).decode()
+
+    def parse_frame(self, text):
+        lines = text.splitlines()
+        if lines[0].strip() != str(self.num_atoms):
+            raise ValueError(f"Frame with '{lines[0].strip()}' atoms in {self.filepath}, expected {self.num_atoms}")
+        iteration, time = parse_frame_header(lines[1])
+        rows = [line.split() for line in lines[2:2 + self.num_atoms]]
+        symbols = [row[0] for row in rows]
+        positions = np.array([row[1:4] for row in rows], dtype=np.float64)
+        return Frame(iteration, time, symbols, positions)
+
+    def frame(self, index):
+        return self.parse_frame(self.read_frame_text(index))
+
+    def frames(self, start=None, stop=None, step=None):
+        """
+        Yields the frames of range(len(self))[start:stop:step]. Consecutive frames are read as one contiguous block;
+        with a step only the wanted frames are read.
+        """
+        indices = range(len(self))[slice(start, stop, step)]
+        if not indices:
+            return
+        with open(self.filepath, 'rb') as file:
+            if indices.step == 1:
+                file.seek(int(self.offsets[indices.start]))
+                for index in indices:
+                    text = file.read(int(self.offsets[index + 1] - self.offsets[index])).decode()
+                    yield self.parse_frame(text)
+            else:
+                for index in indices:
+                    file.seek(int(self.offsets[index]))
+                    yield self.parse_frame(file.read(int(self.offsets[index + 1] - self.offsets[index])).decode())
+
+    def read_positions(self, start=None, stop=None, step=None, atoms=None):
+        """
+        Stacks the frames of range(len(self))[start:stop:step] into (iterations, times, positions) arrays, positions
+        being (frames x atoms x 3). atoms selects a subset of atom indices.
+        """
+        iterations = []
+        times = []
+        positions = []
+        for frame in self.frames(start, stop, step):
+            iterations.append(frame.iteration)
+            times.append(frame.time)
+            positions.append(frame.positions if atoms is None else frame.positions[atoms])
+        positions = np.array(positions) if positions else np.zeros((0, self.num_atoms if atoms is None else
+                                                                    len(np.atleast_1d(atoms)), 3))
+        return np.array(iterations), np.array(times), positions
+
+    def symbols(self):
+        return self.frame(0).symbols if len(self) else []